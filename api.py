@@ -0,0 +1,143 @@
+import hashlib
+
+from flask import Blueprint, Response, abort, jsonify, request, url_for
+
+from genre_registry import genre_registry
+from models import db, Artist, Show, Venue, artist_genres, table_versions, venue_genres
+from pagination import paginate_ranked_request, paginate_request
+from search import search
+
+
+# Read-only JSON API. Collections are paged with keyset cursors (see
+# pagination.py): a page is {"data": [...], "next": url, "prev": url}, and
+# ?after=, ?before= and ?per_page= work as on the listing pages. Their ETag
+# is the version of the collection's table in table_versions (see
+# freshness.py), one primary key lookup that every write to the table
+# bumps. It is read before the page, in the same transaction, so a body is
+# never older than its ETag, and a matching If-None-Match gets a 304
+# without reading the page at all. Search results are paged too, by rank
+# offset. Single documents and search pages are small and are hashed after
+# serialization instead.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+VENUE_COLUMNS = (
+    Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.phone, Venue.image_link,
+    Venue.facebook_link, Venue.website_link, Venue.seeking_talent, Venue.seeking_description,
+)
+ARTIST_COLUMNS = (
+    Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone, Artist.image_link,
+    Artist.facebook_link, Artist.website_link, Artist.seeking_venue, Artist.seeking_description,
+)
+SHOW_COLUMNS = (Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)
+
+
+def _serialize(row):
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in zip(row.keys(), row)}
+
+
+def _table_version(model):
+    version = db.session.query(table_versions.c.version).filter(table_versions.c.name == model.__tablename__).scalar()
+    return hashlib.md5('{}:{}'.format(model.__tablename__, version).encode('utf-8')).hexdigest()
+
+
+def _page_url(**cursor):
+    # The current URL with ?after= or ?before= replaced
+    args = {key: value for key, value in request.args.items() if key not in ('after', 'before')}
+    return url_for(request.endpoint, _external=True, **dict(args, **cursor))
+
+
+def _collection(model, columns):
+    etag = _table_version(model)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        page = paginate_request(db.session.query(*columns), columns[:1])
+        response = jsonify({
+            "data": [_serialize(row) for row in page.items],
+            "next": _page_url(after=page.next_cursor) if page.has_next else None,
+            "prev": _page_url(before=page.prev_cursor) if page.has_prev else None,
+        })
+    response.set_etag(etag)
+    return response
+
+
+def _search_results(model, columns):
+    # Best matches first, a page at a time like the collections; a missing
+    # ?q= pages through every row
+    page = paginate_ranked_request(search(model, request.args.get('q', '')).with_entities(*columns))
+    return _document({
+        "data": [_serialize(row) for row in page.items],
+        "next": _page_url(after=page.next_cursor) if page.has_next else None,
+        "prev": _page_url(after=page.prev_cursor) if page.has_prev else None,
+    })
+
+
+def _document(data):
+    response = jsonify(data)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def _entity(columns, entity_id):
+    row = db.session.query(*columns).filter(columns[0] == entity_id).first()
+    if row is None:
+        abort(404)
+    return _serialize(row)
+
+
+@api.errorhandler(400)
+def bad_request(error):
+    return jsonify({"error": "bad request"}), 400
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return jsonify({"error": "not found"}), 404
+
+
+@api.route('/venues')
+def venues():
+    return _collection(Venue, VENUE_COLUMNS)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    data = _entity(VENUE_COLUMNS, venue_id)
+    data['genres'] = genre_registry.names_by_owner(venue_genres.c.venue_id, [venue_id])[venue_id]
+    data['shows'] = [_serialize(row) for row in db.session.query(*SHOW_COLUMNS).filter(Show.venue_id == venue_id).order_by(Show.start_time, Show.id)]
+    return _document(data)
+
+
+@api.route('/artists')
+def artists():
+    return _collection(Artist, ARTIST_COLUMNS)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    data = _entity(ARTIST_COLUMNS, artist_id)
+    data['genres'] = genre_registry.names_by_owner(artist_genres.c.artist_id, [artist_id])[artist_id]
+    data['shows'] = [_serialize(row) for row in db.session.query(*SHOW_COLUMNS).filter(Show.artist_id == artist_id).order_by(Show.start_time, Show.id)]
+    return _document(data)
+
+
+@api.route('/shows')
+def shows():
+    return _collection(Show, SHOW_COLUMNS)
+
+
+@api.route('/shows/<int:show_id>')
+def show(show_id):
+    return _document(_entity(SHOW_COLUMNS, show_id))
+
+
+@api.route('/search/venues')
+def search_venues():
+    return _search_results(Venue, (Venue.id, Venue.name, Venue.city, Venue.state))
+
+
+@api.route('/search/artists')
+def search_artists():
+    return _search_results(Artist, (Artist.id, Artist.name, Artist.city, Artist.state))
@@ -2,17 +2,40 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import functools
 import json
+import math
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort
+import babel.dates
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, session, jsonify, g
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-import logging
-from logging import Formatter, FileHandler
 from flask_wtf import FlaskForm
 from forms import *
+from api import api
+from assets import AssetManifest
+from bookings import BookingConflict
+import freshness
+from freshness import conditional
+from genre_registry import genre_registry
+import geo
+from importer import import_cli
+from logs import configure_logging
+import matchmaking
+from matchmaking import best_matches, match_entity, unmatch_entity
+import metrics
+import query_audit
+from query_audit import query_budget
+from page_cache import PageCache
+from pagination import paginate_request
+from pooling import pool_stats
+from search import index_entity, search, unindex_entity
+import session_store
+import template_cache
+from show_counts import show_counts_cli
+from show_listing import shows_cli
 from sqlalchemy import Boolean, DateTime, func
+from sqlalchemy.orm import joinedload, undefer_group
 from flask_migrate import Migrate
 
 #----------------------------------------------------------------------------#
@@ -22,24 +45,76 @@ from flask_migrate import Migrate
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
-db = SQLAlchemy(app)
 
-from models import Venue, Artist, Show, Genre
+# JSON logs written from a background thread, see logs.py
+configure_logging(app)
+
+# models.py owns the SQLAlchemy instance so views and models share one session
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+db.init_app(app)
 
 # Initialize Flask-Migrate
 migrate = Migrate(app, db)
 
+# flask import ...
+app.cli.add_command(import_cli)
+
+# flask show-counts refresh, see show_counts.py
+app.cli.add_command(show_counts_cli)
+app.cli.add_command(shows_cli)
+
+# Venue locations from the memory-mapped gazetteer and flask gazetteer ..., see geo.py
+geo.init_app(app)
+
+# /api/v1
+app.register_blueprint(api)
+
+# Server-side sessions when SESSION_STORE_URI is set, see session_store.py
+session_store.init_app(app)
+
+# Fingerprinted /static URLs, see assets.py
+assets = AssetManifest(app)
+
+# ETags of the HTML pages name the release, see freshness.py
+freshness.init_app(app)
+
+# Compiled templates shared on disk and flask templates compile, see template_cache.py
+template_cache.init_app(app)
+
+# Venue/artist matchmaking index, see matchmaking.py; reloaded in a background thread
+matchmaking.init_app(app)
+
+# /metrics, see metrics.py
+metrics.init_app(app)
+
+# N+1 detection and query budgets in development, see query_audit.py
+query_audit.init_app(app)
+
+# Rendered venue and artist detail pages, see page_cache.py
+page_cache = PageCache(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'])
+
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
+@functools.lru_cache(maxsize=64)
+def _datetime_pattern(format, locale):
+  # Compiled babel pattern and parsed locale, built once per (format, locale)
+  return babel.dates.parse_pattern(format), babel.Locale.parse(locale)
+
+def format_datetime(value, format='medium', locale='en'):
+  if isinstance(value, str):
+    # Views pass datetimes; strings are still accepted for pre-formatted values
+    value = dateutil.parser.parse(value)
   if format == 'full':
       format="EEEE MMMM, d, y 'at' h:mma"
   elif format == 'medium':
       format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+  pattern, locale = _datetime_pattern(format, locale)
+  if value.tzinfo is None:
+    # babel.dates.format_datetime treats naive datetimes as UTC as well
+    value = value.replace(tzinfo=babel.dates.UTC)
+  return pattern.apply(value, locale)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
@@ -48,6 +123,7 @@ app.jinja_env.filters['datetime'] = format_datetime
 #----------------------------------------------------------------------------#
 
 @app.route('/')
+@conditional(freshness.static_page)
 def index():
   return render_template('pages/home.html')
 
@@ -56,40 +132,23 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@conditional(freshness.venues_page)
+@query_budget(3)
 def venues():
-  # TODO: replace with real venues data.
-  #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-  data = []
-  locations = Venue.query.with_entities(Venue.city, Venue.state).distinct()
-  for location in locations:
-    # Get all venues in each city/state
-    venues = Venue.query.filter_by(state=location.state, city=location.city).all()
-    venue_data = []
-    for venue in venues:
-      # Get the number of upcoming shows for each venue
-      num_upcoming_shows = Show.query.join(Venue).filter(
-          Show.venue_id == venue.id,
-          Show.start_time > datetime.now()
-      ).count()
-      venue_data.append({
-        "id": venue.id,
-        "name": venue.name,
-        "num_upcoming_shows": num_upcoming_shows,
-      })
-    data.append({
-      "city": location.city,
-      "state": location.state,
-      "venues": venue_data,
-    })
-  return render_template('pages/venues.html', areas=data)
+  # Areas, venues and upcoming show counts all come back from one grouped query,
+  # paged by area so an area may continue onto the next page
+  page = paginate_request(Venue.area_query(), (Venue.state, Venue.city, Venue.id))
+  data = Venue.group_by_area(page.items)
+  return render_template('pages/venues.html', areas=data, page=page)
 
 @app.route('/venues/search', methods=['POST'])
+@query_budget(2)
 def search_venues():
   # Get the search term from the form
   search_term = request.form.get('search_term', '')
 
-  # Query the database for venues whose names contain the search term
-  venues = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()
+  # Query the database for matching venues, most relevant first
+  venues = search(Venue, search_term).options(undefer_group('show_counts')).all()
 
   # Prepare the response
   response = {
@@ -97,19 +156,60 @@ def search_venues():
     "data": [{
       "id": venue.id,
       "name": venue.name,
-      "num_upcoming_shows": Show.query.join(Venue).filter(
-        Show.venue_id == venue.id,
-        Show.start_time > datetime.now()
-      ).count(),
+      "num_upcoming_shows": venue.upcoming_shows_count,
     } for venue in venues]
   }
 
   return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
+@app.route('/venues/near')
+@query_budget(3)
+def venues_near():
+  # ?lat=&lon= or ?city=&state=, with optional ?radius= (km) and ?limit=
+  latitude = request.args.get('lat', type=float)
+  longitude = request.args.get('lon', type=float)
+  city, state = request.args.get('city', ''), request.args.get('state', '')
+  if (latitude is None or longitude is None) and city:
+    latitude, longitude = (geo.gazetteer.locate(city, state) if geo.gazetteer else None) or (None, None)
+  radius = min(request.args.get('radius', app.config['NEAR_RADIUS_KM'], type=float), app.config['NEAR_MAX_RADIUS_KM'])
+  limit = min(request.args.get('limit', app.config['PAGE_SIZE'], type=int), app.config['MAX_PAGE_SIZE'])
+
+  # float() accepts nan and inf, which no venue is near; longitudes past the
+  # antimeridian wrap around to [-180, 180)
+  located = (latitude is not None and longitude is not None and math.isfinite(latitude) and math.isfinite(longitude)
+             and -90 <= latitude <= 90 and math.isfinite(radius) and radius > 0 and limit > 0)
+  if located:
+    longitude = (longitude + 180) % 360 - 180
+  nearby = geo.nearby(latitude, longitude, radius, limit) if located else []
+  response = {
+    "count": len(nearby),
+    "data": [{
+      "id": venue.id,
+      "name": venue.name,
+      "city": venue.city,
+      "state": venue.state,
+      "distance_km": distance,
+    } for distance, venue in nearby]
+  }
+
+  return render_template('pages/venues_near.html', results=response, located=located,
+                         city=city, state=state, latitude=latitude, longitude=longitude, radius=radius)
+
 @app.route('/venues/<int:venue_id>')
+@conditional(freshness.venue_page)
+@query_budget(7)
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
   # TODO: replace with real venue data from the venues table, using venue_id
+  # Serve the rendered page from the cache unless there are flashes to show on it.
+  # Keying on the freshness ETag retires entries as soon as any rendered row changes.
+  cacheable = '_flashes' not in session
+  cache_key = ('venue', venue_id, g.get('page_etag'))
+  if cacheable:
+    page = page_cache.get(cache_key)
+    if page is not None:
+      return page
+
   # Query the database for the venue with the given ID
   venue = Venue.query.get(venue_id)
 
@@ -118,15 +218,15 @@ def show_venue(venue_id):
     abort(404)
 
   # Query the database for the venue's shows
-  past_shows_query = Show.query.filter(Show.venue_id == venue_id, Show.start_time < datetime.now()).all()
-  upcoming_shows_query = Show.query.filter(Show.venue_id == venue_id, Show.start_time > datetime.now()).all()
+  past_shows_query = Show.query.options(joinedload(Show.artist)).filter(Show.venue_id == venue_id, Show.start_time < datetime.now()).all()
+  upcoming_shows_query = Show.query.options(joinedload(Show.artist)).filter(Show.venue_id == venue_id, Show.start_time > datetime.now()).all()
 
   # Prepare the data for the past shows
   past_shows = [{
     "artist_id": show.artist_id,
     "artist_name": show.artist.name,
     "artist_image_link": show.artist.image_link,
-    "start_time": show.start_time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    "start_time": show.start_time
   } for show in past_shows_query]
 
   # Prepare the data for the upcoming shows
@@ -134,14 +234,14 @@ def show_venue(venue_id):
     "artist_id": show.artist_id,
     "artist_name": show.artist.name,
     "artist_image_link": show.artist.image_link,
-    "start_time": show.start_time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    "start_time": show.start_time
   } for show in upcoming_shows_query]
 
   # Prepare the data for the venue
   data = {
     "id": venue.id,
     "name": venue.name,
-    "genres": [genre.name for genre in venue.genres],
+    "genres": genre_registry.names_by_owner(venue_genres.c.venue_id, [venue.id])[venue.id],
     "address": venue.address,
     "city": venue.city,
     "state": venue.state,
@@ -151,13 +251,19 @@ def show_venue(venue_id):
     "seeking_talent": venue.seeking_talent,
     "seeking_description": venue.seeking_description,
     "image_link": venue.image_link,
+    "matches": best_matches(venue) if venue.seeking_talent else [],
     "past_shows": past_shows,
     "upcoming_shows": upcoming_shows,
     "past_shows_count": len(past_shows),
     "upcoming_shows_count": len(upcoming_shows),
   }
-  print(data['website'])
-  return render_template('pages/show_venue.html', venue=data)
+  app.logger.debug('venue %s website %s', venue_id, data['website'])
+  page = render_template('pages/show_venue.html', venue=data)
+  if cacheable:
+    # The page goes stale when its next upcoming show starts
+    next_start = min((show.start_time for show in upcoming_shows_query), default=None)
+    page_cache.set(cache_key, page, expires_at=next_start)
+  return page
 
 #  Create Venue
 #  ----------------------------------------------------------------
@@ -169,8 +275,8 @@ def create_venue_form():
 
 @app.route('/venues/create', methods=['POST'])
 def create_venue_submission():
-  print("VENUE IS BEING CREATED YURRRRRRRR")
   form = VenueForm(request.form)
+  app.logger.info('creating venue %r', form.name.data)
   # (done) TODO: insert form data as a new Venue record in the db, instead
   try:
     venue = Venue(
@@ -185,20 +291,25 @@ def create_venue_submission():
         seeking_talent=form.seeking_talent.data,
         seeking_description=form.seeking_description.data,
     )
-    # Handle genres
-    genres = Genre.query.filter(func.lower(Genre.name).in_([name.lower() for name in form.genres.data])).all()
-    venue.genres = genres
-
-    print("genres", genres)
-    
     db.session.add(venue)
+    db.session.flush()
+
+    # Handle genres: link them in bulk, resolving names through the genre registry
+    genre_ids = genre_registry.ids_for(form.genres.data)
+    if genre_ids:
+      db.session.execute(venue_genres.insert(), [{"venue_id": venue.id, "genre_id": genre_id} for genre_id in genre_ids])
+
+    app.logger.debug('venue genres %s', genre_ids)
+
     db.session.commit()
+    index_entity(venue)
+    match_entity(venue, genre_ids)
     # TODO: modify data to be the data object returned from db insertion
     # on successful db insert, flash success
     flash('Venue ' + form.name.data + ' was successfully listed!')
-  except Exception as e:
+  except Exception:
     db.session.rollback()
-    print(str(e))
+    app.logger.exception('could not create venue %r', form.name.data)
     flash('An error occurred. Venue ' + form.name.data + ' could not be listed.')
   # (done) TODO: on unsuccessful db insert, flash an error instead.
   # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
@@ -212,8 +323,12 @@ def delete_venue(venue_id):
     venue = Venue.query.get(venue_id)
     if venue:
       # If the venue exists, delete it from the session and commit
+      cached_pages = [('venue', venue.id)] + [('artist', show.artist_id) for show in venue.shows]
       db.session.delete(venue)
       db.session.commit()
+      unindex_entity(Venue, venue.id)
+      unmatch_entity(Venue, venue.id)
+      page_cache.invalidate(*cached_pages)
       flash('Venue ' + venue.name + ' was successfully deleted!')
     else:
       flash('Venue not found.')
@@ -235,10 +350,14 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@conditional(freshness.artists_page)
+@query_budget(4)
 def artists():
   # (done) TODO: replace with real data returned from querying the database
-  # Query the database for all artists
-  artists = Artist.query.all()
+  # Query the database for one page of artists, with their show counts aggregated in the same query
+  page = paginate_request(Artist.query.options(undefer_group('show_counts')), (Artist.name, Artist.id))
+  artists = page.items
+  genre_names = genre_registry.names_by_owner(artist_genres.c.artist_id, [artist.id for artist in artists])
 
   # Format the data for the template
   data = [{
@@ -247,7 +366,7 @@ def artists():
     "city": artist.city, 
     "state": artist.state, 
     "phone": artist.phone, 
-    "genres": artist.genres,
+    "genres": genre_names[artist.id],
     "image_link": artist.image_link, 
     "facebook_link": artist.facebook_link, 
     "seeking_venue": artist.seeking_venue, 
@@ -256,16 +375,17 @@ def artists():
     "past_shows_count": artist.past_shows_count
 } for artist in artists]
 
-  print(data)
-  return render_template('pages/artists.html', artists=data)
+  app.logger.debug('artists page %s', data)
+  return render_template('pages/artists.html', artists=data, page=page)
 
 @app.route('/artists/search', methods=['POST'])
+@query_budget(2)
 def search_artists():
   # Get the search term from the form
   search_term = request.form.get('search_term', '')
 
-  # Query the database for artists whose names contain the search term
-  artists = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()
+  # Query the database for matching artists, most relevant first
+  artists = search(Artist, search_term).options(undefer_group('show_counts')).all()
 
   # Prepare the response
   response = {
@@ -273,16 +393,27 @@ def search_artists():
     "data": [{
       "id": artist.id,
       "name": artist.name,
-      "num_upcoming_shows": len([show for show in artist.shows if show.start_time > datetime.now()]),
+      "num_upcoming_shows": artist.upcoming_shows_count,
     } for artist in artists]
   }
 
   return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 @app.route('/artists/<int:artist_id>')
+@conditional(freshness.artist_page)
+@query_budget(7)
 def show_artist(artist_id):
   # shows the artist page with the given artist_id
   # TODO: replace with real artist data from the artist table, using artist_id
+  # Serve the rendered page from the cache unless there are flashes to show on it.
+  # Keying on the freshness ETag retires entries as soon as any rendered row changes.
+  cacheable = '_flashes' not in session
+  cache_key = ('artist', artist_id, g.get('page_etag'))
+  if cacheable:
+    page = page_cache.get(cache_key)
+    if page is not None:
+      return page
+
   # Query the database for the artist with the given ID
   artist = Artist.query.get(artist_id)
 
@@ -291,15 +422,15 @@ def show_artist(artist_id):
     abort(404)
 
   # Query the database for the artist's shows
-  past_shows_query = Show.query.filter(Show.artist_id == artist_id, Show.start_time < datetime.now()).all()
-  upcoming_shows_query = Show.query.filter(Show.artist_id == artist_id, Show.start_time > datetime.now()).all()
+  past_shows_query = Show.query.options(joinedload(Show.venue)).filter(Show.artist_id == artist_id, Show.start_time < datetime.now()).all()
+  upcoming_shows_query = Show.query.options(joinedload(Show.venue)).filter(Show.artist_id == artist_id, Show.start_time > datetime.now()).all()
 
   # Prepare the data for the past shows
   past_shows = [{
     "venue_id": show.venue_id,
     "venue_name": show.venue.name,
     "venue_image_link": show.venue.image_link,
-    "start_time": show.start_time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    "start_time": show.start_time
   } for show in past_shows_query]
 
   # Prepare the data for the upcoming shows
@@ -307,14 +438,14 @@ def show_artist(artist_id):
     "venue_id": show.venue_id,
     "venue_name": show.venue.name,
     "venue_image_link": show.venue.image_link,
-    "start_time": show.start_time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    "start_time": show.start_time
   } for show in upcoming_shows_query]
   
     # Prepare the data for the artist
   data = {
     "id": artist.id,
     "name": artist.name,
-    "genres": [genre.name for genre in artist.genres],
+    "genres": genre_registry.names_by_owner(artist_genres.c.artist_id, [artist.id])[artist.id],
     "city": artist.city,
     "state": artist.state,
     "phone": artist.phone,
@@ -323,13 +454,19 @@ def show_artist(artist_id):
     "seeking_venue": artist.seeking_venue,
     "seeking_description": artist.seeking_description,
     "image_link": artist.image_link,
+    "matches": best_matches(artist) if artist.seeking_venue else [],
     "past_shows": past_shows,
     "upcoming_shows": upcoming_shows,
     "past_shows_count": len(past_shows),
     "upcoming_shows_count": len(upcoming_shows),
   }
-  print(data['website'])
-  return render_template('pages/show_artist.html', artist=data)
+  app.logger.debug('artist %s website %s', artist_id, data['website'])
+  page = render_template('pages/show_artist.html', artist=data)
+  if cacheable:
+    # The page goes stale when its next upcoming show starts
+    next_start = min((show.start_time for show in upcoming_shows_query), default=None)
+    page_cache.set(cache_key, page, expires_at=next_start)
+  return page
 
 #  Update
 #  ----------------------------------------------------------------
@@ -396,7 +533,7 @@ def create_artist_form():
 @app.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   form = ArtistForm(request.form)
-  print("ARTIST IS BEING CREATED YURRRRRRRR")
+  app.logger.info('creating artist %r', form.name.data)
   # called upon submitting the new artist listing form
   # (done) TODO: insert form data as a new Artist record in the db, instead
   # (done) TODO: modify data to be the data object returned from db insertion
@@ -414,17 +551,24 @@ def create_artist_submission():
       seeking_description=form.seeking_description.data,
       website_link=form.website_link.data
     )
-    genres = Genre.query.filter(func.lower(Genre.name).in_([name.lower() for name in form.genres.data])).all()
-    artist.genres = genres
-
     # Add the new Artist object to the database
     db.session.add(artist)
+    db.session.flush()
+
+    # Link genres in bulk, resolving names through the genre registry
+    genre_ids = genre_registry.ids_for(form.genres.data)
+    if genre_ids:
+      db.session.execute(artist_genres.insert(), [{"artist_id": artist.id, "genre_id": genre_id} for genre_id in genre_ids])
+
     db.session.commit()
+    index_entity(artist)
+    match_entity(artist, genre_ids)
 
     # on successful db insert, flash success
     flash('Artist ' + form.name.data + ' was successfully listed!')
-  except:
+  except Exception:
     db.session.rollback()
+    app.logger.exception('could not create artist %r', form.name.data)
     flash('An error occurred. Artist ' + form.name.data + ' could not be listed.')
   finally: 
     db.session.close()
@@ -437,23 +581,27 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@conditional(freshness.shows_page)
+@query_budget(1)
 def shows():
   # displays list of shows at /shows
-  # TODO: replace with real venues data.
-  shows = Show.query.all()  # Assuming you have a Show model defined
+  # Reads the name copies on Show (see show_listing.py), so one narrow query and no joins
+  listing = db.session.query(Show.id, Show.venue_id, Show.venue_name, Show.artist_id, Show.artist_name,
+                             Show.image_link, Show.start_time)
+  page = paginate_request(listing, (Show.start_time, Show.id))
 
   data = []
-  for show in shows:
+  for show in page.items:
     data.append({
       "venue_id": show.venue_id,
-      "venue_name": show.venue.name,  # Assuming you have a Venue model with a name attribute
+      "venue_name": show.venue_name,
       "artist_id": show.artist_id,
-      "artist_name": show.artist.name,  # Assuming you have an Artist model with a name attribute
-      "artist_image_link": show.artist.image_link,  # Assuming you have an Artist model with an image_link attribute
-      "start_time": show.start_time.strftime('%Y-%m-%dT%H:%M:%S.000Z')  # Formatting the start_time as a string
+      "artist_name": show.artist_name,
+      "artist_image_link": show.image_link,
+      "start_time": show.start_time  # the datetime filter formats it in the template
     })
 
-  return render_template('pages/shows.html', shows=data)
+  return render_template('pages/shows.html', shows=data, page=page)
 
 @app.route('/shows/create')
 def create_shows():
@@ -463,21 +611,30 @@ def create_shows():
 
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
-  print("SHOW IS BEING CREATED YURRRRRRRR")
   # called to create new shows in the db, upon submitting new show listing form
 
   # Get form data
   form = ShowForm(request.form)
+  if not form.validate():
+    # A missing start time or an end time before it goes back to the form
+    return render_template('forms/new_show.html', form=form), 400
+  app.logger.info('creating show at venue %s for artist %s', form.venue_id.data, form.artist_id.data)
   try: 
     show = Show(
       venue_id=form.venue_id.data,
       artist_id=form.artist_id.data,
-      start_time=form.start_time.data
+      start_time=form.start_time.data,
+      end_time=form.end_time.data
     )
     db.session.add(show)
     db.session.commit()
+    page_cache.invalidate(('venue', show.venue_id), ('artist', show.artist_id))
     # On successful db insert, flash success
     flash('Show was successfully listed!')
+  except BookingConflict as e:
+    # Overlaps another show at the venue or of the artist (see bookings.py)
+    db.session.rollback()
+    flash('Show could not be listed: {}.'.format(e))
   except:
     # On unsuccessful db insert, flash an error instead.  
     db.session.rollback()
@@ -487,6 +644,14 @@ def create_show_submission():
 
   return render_template('pages/home.html')
 
+@app.route('/page-cache/stats')
+def page_cache_stats():
+  return jsonify(page_cache.stats())
+
+@app.route('/db-pool/stats')
+def db_pool_stats():
+  return jsonify(pool_stats(db.engine))
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -496,16 +661,6 @@ def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
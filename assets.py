@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup, with_appcontext
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Fingerprinted static files. At startup every file under static/ is hashed
+# and url_for('static', filename='css/main.css') emits
+# /static/css/main.<hash>.css instead. A fingerprinted name only ever refers
+# to one version of the file, so it is served with a one-year immutable
+# Cache-Control; a deploy that changes the file changes its URL. Plain names
+# keep working with Flask's default max-age.
+#
+# `flask assets compress` writes .gz (and .br when the brotli package is
+# installed) next to each compressible file. They are served in place of the
+# original to clients that accept them, as long as they are newer than it.
+
+COMPRESSED = ('br', 'gz')
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.ico', '.txt')
+
+assets_cli = AppGroup('assets', help='Precompress static files.')
+
+
+def _digest(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def _fingerprinted(filename, digest):
+    root, ext = os.path.splitext(filename)
+    return '{}.{}{}'.format(root, digest, ext)
+
+
+def _static_files(folder):
+    for directory, subdirectories, files in os.walk(folder):
+        for name in files:
+            if name.startswith('.') or name.endswith(tuple('.' + suffix for suffix in COMPRESSED)):
+                continue
+            path = os.path.join(directory, name)
+            yield os.path.relpath(path, folder).replace(os.sep, '/'), path
+
+
+class AssetManifest(object):
+
+    def __init__(self, app=None):
+        self.urls = {}
+        self.files = {}
+        self.variants = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_age = app.config['ASSET_MAX_AGE']
+        self.build(app.static_folder)
+        app.url_defaults(self._fingerprint_url)
+        app.view_functions['static'] = self.send_static_file
+        app.cli.add_command(assets_cli)
+        app.extensions['assets'] = self
+
+    def build(self, folder):
+        urls, files, variants = {}, {}, {}
+        for filename, path in _static_files(folder):
+            fingerprinted = _fingerprinted(filename, _digest(path))
+            urls[filename] = fingerprinted
+            files[fingerprinted] = filename
+            modified = os.path.getmtime(path)
+            variants[filename] = [
+                encoding for encoding in COMPRESSED
+                if os.path.exists(path + '.' + encoding) and os.path.getmtime(path + '.' + encoding) >= modified
+            ]
+        self.urls, self.files, self.variants = urls, files, variants
+
+    def _fingerprint_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.urls:
+            values['filename'] = self.urls[values['filename']]
+
+    def send_static_file(self, filename):
+        immutable = filename in self.files
+        filename = self.files.get(filename, filename)
+        variants = self.variants.get(filename, ())
+        encoding = next((encoding for encoding in variants
+                         if request.accept_encodings[encoding if encoding == 'br' else 'gzip']), None)
+        options = {'mimetype': mimetypes.guess_type(filename)[0]}
+        if immutable:
+            options['cache_timeout'] = self.max_age
+        response = send_from_directory(current_app.static_folder, filename + '.' + encoding if encoding else filename, **options)
+        if encoding:
+            response.content_encoding = 'br' if encoding == 'br' else 'gzip'
+        if variants:
+            response.vary.add('Accept-Encoding')
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+
+@assets_cli.command('compress', help='Write .gz and .br copies of compressible static files.')
+@with_appcontext
+def compress():
+    written = 0
+    for filename, path in _static_files(current_app.static_folder):
+        if not filename.endswith(COMPRESSIBLE):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        written += 1
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data))
+            written += 1
+    if brotli is None:
+        click.echo('brotli is not installed, wrote gzip copies only', err=True)
+    current_app.extensions['assets'].build(current_app.static_folder)
+    click.echo('{} compressed files written'.format(written))
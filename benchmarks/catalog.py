@@ -0,0 +1,171 @@
+"""Synthetic Fyyur catalog for benchmarks.
+
+Venue popularity follows a Zipf distribution, so a few venues host most of
+the shows, as they do in real listings. Artists are picked with a flatter
+Zipf skew. Shows are spread from two years in the past to one year ahead
+and last two hours, starting on the hour from noon on. Shows never overlap
+at a venue or for an artist; a draw that would is redrawn a few times and
+then dropped, so the busiest venues fill up on very large catalogs. Every
+venue and artist gets one to four genres, and popular genres are more
+likely to be picked.
+
+    python -m benchmarks.catalog [number_of_shows]
+
+fills the database configured in config.py (or $FYYUR_BENCH_DATABASE_URL).
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from forms import VenueForm
+from freshness import touch_on_commit
+from genre_registry import genre_registry
+from geo import geocell, location_values
+from importer import insert_rows
+from models import db, Artist, Genre, Show, Venue, artist_genres, venue_genres
+from show_counts import refresh
+from show_listing import fill
+
+BATCH = 10000
+SHOW_HOURS = 2
+REDRAWS = 5
+
+STATES = ['CA', 'NY', 'TX', 'IL', 'WA', 'LA', 'TN', 'GA', 'OR', 'MA']
+CITIES = {
+    'CA': ['San Francisco', 'Los Angeles', 'Oakland'], 'NY': ['New York', 'Brooklyn'], 'TX': ['Austin', 'Houston'],
+    'IL': ['Chicago'], 'WA': ['Seattle'], 'LA': ['New Orleans'], 'TN': ['Nashville', 'Memphis'], 'GA': ['Atlanta'],
+    'OR': ['Portland'], 'MA': ['Boston'],
+}
+WORDS = ['Blue', 'Red', 'Velvet', 'Electric', 'Golden', 'Hollow', 'Silver', 'Midnight', 'Paper', 'Iron',
+         'Owl', 'Fox', 'Lantern', 'Harbor', 'Garden', 'River', 'Echo', 'Union', 'Station', 'Parlor']
+
+
+def zipf_weights(n, s):
+    # Cumulative weights of ranks 1..n for random.choices(cum_weights=...)
+    return list(accumulate(1.0 / rank ** s for rank in range(1, n + 1)))
+
+
+def _name(rng, suffix, number):
+    return '{} {} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS), suffix, number)
+
+
+def _location(rng):
+    state = rng.choice(STATES)
+    return rng.choice(CITIES[state]), state
+
+
+def _spread(rng, city, state):
+    # Venues scattered up to about 20 km around their city's gazetteer point
+    values = location_values(city, state)
+    if values['latitude'] is not None:
+        latitude = values['latitude'] + rng.uniform(-0.18, 0.18)
+        longitude = values['longitude'] + rng.uniform(-0.18, 0.18)
+        values = {'latitude': latitude, 'longitude': longitude, 'geocell': geocell(latitude, longitude)}
+    return values
+
+
+def _genre_ids(rng, genre_ids, genre_weights):
+    picks = rng.choices(genre_ids, cum_weights=genre_weights, k=rng.randint(1, 4))
+    return list(dict.fromkeys(picks))
+
+
+def _free_slot(rng, booked, venue_id, artist_id):
+    # booked maps (owner, day) to a bitmask of the hours taken that day
+    for _ in range(REDRAWS):
+        day, hour = rng.randint(0, 1095), rng.randint(12, 24 - SHOW_HOURS)
+        hours = ((1 << SHOW_HOURS) - 1) << hour
+        keys = (('venue', venue_id, day), ('artist', artist_id, day))
+        if not any(booked.get(key, 0) & hours for key in keys):
+            for key in keys:
+                booked[key] = booked.get(key, 0) | hours
+            return day, hour
+    return None
+
+
+def _ensure_genres():
+    existing = {name for name, in db.session.query(Genre.name)}
+    names = [name for name, label in VenueForm.genres.kwargs['choices']]
+    missing = [{'name': name} for name in names if name not in existing]
+    if missing:
+        insert_rows(Genre.__table__, missing)
+    db.session.commit()
+    genre_registry.refresh()
+    return genre_registry.ids_for(names)
+
+
+def _owners(rng, model, count, suffix, link_table, owner, genre_ids, genre_weights, values):
+    ids = []
+    for start in range(0, count, BATCH):
+        rows = []
+        for number in range(start, min(start + BATCH, count)):
+            city, state = _location(rng)
+            row = {'name': _name(rng, suffix, number), 'city': city, 'state': state, 'phone': '555-555-5555',
+                   'image_link': 'https://example.com/{}/{}.jpg'.format(suffix.lower(), number),
+                   'facebook_link': 'https://facebook.com/{}{}'.format(suffix.lower(), number)}
+            row.update(values(rng, city, state))
+            rows.append(row)
+        new_ids = insert_rows(model.__table__, rows, returning=True)
+        links = [{owner: new_id, 'genre_id': genre_id}
+                 for new_id in new_ids for genre_id in _genre_ids(rng, genre_ids, genre_weights)]
+        insert_rows(link_table, links, ignore_conflicts=True)
+        db.session.commit()
+        ids.extend(new_ids)
+    return ids
+
+
+def generate(shows=10000, seed=1, now=None):
+    """Adds a catalog with `shows` shows and returns its venue, artist and show ids.
+    Venue and artist ids are ordered from the most to the least popular."""
+    rng = random.Random(seed)
+    now = now or datetime.now().replace(minute=0, second=0, microsecond=0)
+    genre_ids = _ensure_genres()
+    genre_weights = zipf_weights(len(genre_ids), 1.0)
+    # Drawn separately so locations leave the rest of the catalog unchanged
+    places = random.Random(seed)
+
+    venue_ids = _owners(rng, Venue, max(10, shows // 20), 'Hall', venue_genres, 'venue_id', genre_ids, genre_weights,
+                        lambda rng, city, state: dict(_spread(places, city, state),
+                                                      address='{} Main St'.format(rng.randint(1, 999)),
+                                                      seeking_talent=rng.random() < 0.3))
+    artist_ids = _owners(rng, Artist, max(10, shows // 10), 'Band', artist_genres, 'artist_id', genre_ids, genre_weights,
+                         lambda rng, city, state: {'seeking_venue': rng.random() < 0.3})
+    venue_weights = zipf_weights(len(venue_ids), 1.1)
+    artist_weights = zipf_weights(len(artist_ids), 0.8)
+
+    first_day = now - timedelta(days=730)
+    booked = {}
+    for start in range(0, shows, BATCH):
+        rows = []
+        for number in range(start, min(start + BATCH, shows)):
+            venue_id = rng.choices(venue_ids, cum_weights=venue_weights)[0]
+            artist_id = rng.choices(artist_ids, cum_weights=artist_weights)[0]
+            slot = _free_slot(rng, booked, venue_id, artist_id)
+            if slot is None:
+                continue
+            start_time = (first_day + timedelta(days=slot[0])).replace(hour=slot[1])
+            rows.append({
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': start_time,
+                'end_time': start_time + timedelta(hours=SHOW_HOURS),
+            })
+        if rows:
+            insert_rows(Show.__table__, rows)
+            db.session.commit()
+    fill()
+    refresh()
+    touch_on_commit(db.session, Venue, Artist)
+    db.session.commit()
+    show_ids = [show_id for show_id, in db.session.query(Show.id).order_by(Show.id)]
+    return venue_ids, artist_ids, show_ids
+
+
+if __name__ == '__main__':
+    import os
+    from app import app
+    if os.environ.get('FYYUR_BENCH_DATABASE_URL'):
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['FYYUR_BENCH_DATABASE_URL']
+    with app.app_context():
+        venue_ids, artist_ids, show_ids = generate(*[int(arg) for arg in sys.argv[1:2]])
+        print('%d venues, %d artists, %d shows' % (len(venue_ids), len(artist_ids), len(show_ids)))
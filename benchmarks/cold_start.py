@@ -0,0 +1,94 @@
+"""Cold start benchmark: the first request of each route in a new worker.
+
+Builds a catalog (see benchmarks/catalog.py) in a fresh SQLite file, or in
+the empty database at $FYYUR_BENCH_DATABASE_URL, and runs
+`flask templates compile` into a fresh TEMPLATE_CACHE_DIR. Then, for every
+read route, it starts one new process without the template cache and one
+with it. Each process imports the app and times its first request to that
+route and then a second one. The second request is already warm, so the
+gap between the two shows what a new worker costs the first user.
+
+    python -m benchmarks.cold_start [--shows N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.routes import _request_factory, _routes
+
+
+def child(path, options):
+    # Runs in the new process; TEMPLATE_CACHE_DIR comes from its environment
+    from app import app
+    app.config.update(SQLALCHEMY_DATABASE_URI=os.environ['FYYUR_BENCH_DATABASE_URL'], WTF_CSRF_ENABLED=False,
+                      QUERY_AUDIT='', METRICS_DIR='')
+    client = app.test_client()
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        response = client.open(path, **options)
+        response.get_data()
+        timings.append(time.perf_counter() - started)
+    print(json.dumps({'first_ms': round(timings[0] * 1000, 2), 'warm_ms': round(timings[1] * 1000, 2),
+                      'status': response.status_code}))
+
+
+def _spawn(path, options, database_url, cache_dir):
+    environment = dict(os.environ, FYYUR_BENCH_DATABASE_URL=database_url, FYYUR_TEMPLATE_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.cold_start', '--child', json.dumps([path, options])],
+                            env=environment, stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(shows, seed):
+    cache_dir = tempfile.mkdtemp()
+    os.environ['FYYUR_TEMPLATE_CACHE_DIR'] = cache_dir
+    from app import app
+    from models import db, Venue
+    from benchmarks.catalog import generate
+
+    database_url = os.environ.get('FYYUR_BENCH_DATABASE_URL') or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app.config.update(SQLALCHEMY_DATABASE_URI=database_url, QUERY_AUDIT='', METRICS_DIR='')
+    with app.app_context():
+        db.create_all()
+        catalog = generate(shows, seed) + ([name for name, in db.session.query(Venue.name).limit(1000)],)
+    result = app.test_cli_runner().invoke(args=['templates', 'compile'])
+    print(result.output.strip())
+
+    rng = random.Random(seed)
+    routes = {}
+    for rule, method in _routes(app):
+        path, options = _request_factory(app, rule, method, catalog, rng)()
+        route = '{} {}'.format(method, rule.rule)
+        routes[route] = {name: _spawn(path, options, database_url, directory)
+                         for name, directory in (('no cache', ''), ('compiled', cache_dir))}
+        print('{:<45} first {:>8} ms  compiled first {:>8} ms  warm {:>8} ms'.format(
+            route, routes[route]['no cache']['first_ms'], routes[route]['compiled']['first_ms'], routes[route]['compiled']['warm_ms']))
+    return {'meta': {'shows': shows, 'seed': seed, 'python': sys.version.split()[0]}, 'routes': routes}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the first request of every read route in a new worker.')
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmarks/cold_start.json')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return child(*json.loads(args.child))
+
+    results = run(args.shows, args.seed)
+    first = sum(route['no cache']['first_ms'] for route in results['routes'].values())
+    compiled = sum(route['compiled']['first_ms'] for route in results['routes'].values())
+    print('first requests: {:.0f} ms without the template cache, {:.0f} ms with it'.format(first, compiled))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""Micro-benchmark for the `datetime` Jinja filter.
+
+Compares the old path, where views strftime'd start_time and the filter
+re-parsed the string with dateutil before calling babel.dates.format_datetime,
+with the current path that formats native datetimes through cached patterns.
+
+    python -m benchmarks.datetime_filter [number_of_shows]
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import format_datetime
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def main(shows=2000, repeat=5):
+    start = datetime(2026, 1, 1, 20, 0)
+    times = [start + timedelta(hours=i) for i in range(shows)]
+    strings = [t.strftime('%Y-%m-%dT%H:%M:%S.000Z') for t in times]
+
+    assert [legacy_format_datetime(s, 'full') for s in strings] == [format_datetime(t, 'full') for t in times]
+
+    legacy = min(timeit.repeat(lambda: [legacy_format_datetime(s, 'full') for s in strings], number=1, repeat=repeat))
+    current = min(timeit.repeat(lambda: [format_datetime(t, 'full') for t in times], number=1, repeat=repeat))
+    print('%d shows: legacy %.1f ms, current %.1f ms (%.1fx)' % (shows, legacy * 1000, current * 1000, legacy / current))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
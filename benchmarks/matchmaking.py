@@ -0,0 +1,99 @@
+"""Benchmark for the matchmaking index (see matchmaking.py).
+
+Builds the index over a synthetic population, half venues and half
+artists, with one to four Zipf-skewed genres each and about 30% seeking.
+It then times lookups against the naive approach, which scores every
+seeking entity of the other kind for each lookup, and incremental adds
+and removes. Every sampled lookup is checked against the naive result.
+The database is not involved.
+
+    python -m benchmarks.matchmaking [number_of_entities] [lookups]
+"""
+import random
+import sys
+import time
+
+from benchmarks.catalog import zipf_weights
+from matchmaking import LIMIT, OTHER, MatchIndex, genre_bits
+
+GENRES = 19
+SEEKING = 0.3
+
+
+def population(entities, seed=1):
+    rng = random.Random(seed)
+    weights = zipf_weights(GENRES, 1.0)
+    rows = {'venue': [], 'artist': []}
+    for number in range(entities):
+        genre_ids = set(rng.choices(range(1, GENRES + 1), cum_weights=weights, k=rng.randint(1, 4)))
+        rows['venue' if number % 2 else 'artist'].append((number // 2 + 1, rng.random() < SEEKING, sorted(genre_ids)))
+    return rows
+
+
+def naive_matches(rows, kind, entity_id):
+    # Scores every seeking candidate, as a query or loop without the index would
+    bits = {entity_id: genre_bits(genre_ids) for entity_id, seeking, genre_ids in rows[kind]}[entity_id]
+    scored = []
+    for candidate_id, seeking, genre_ids in rows[OTHER[kind]]:
+        shared = bin(bits & genre_bits(genre_ids)).count('1')
+        if seeking and shared:
+            scored.append((-shared, candidate_id))
+    return [candidate_id for shared, candidate_id in sorted(scored)[:LIMIT]]
+
+
+def main(entities=100000, lookups=1000, seed=1):
+    rows = population(entities, seed)
+    rng = random.Random(seed)
+    index = MatchIndex()
+
+    started = time.perf_counter()
+    index.build(rows['venue'], rows['artist'])
+    built = time.perf_counter() - started
+
+    sample = [(kind, rng.choice(rows[kind])[0]) for kind in rng.choices(['venue', 'artist'], k=lookups)]
+    started = time.perf_counter()
+    for kind, entity_id in sample:
+        index.matches(kind, entity_id)
+    indexed = (time.perf_counter() - started) / lookups
+
+    checked = sample[:20]
+    started = time.perf_counter()
+    for kind, entity_id in checked:
+        assert index.matches(kind, entity_id) == naive_matches(rows, kind, entity_id), (kind, entity_id)
+    naive = (time.perf_counter() - started) / len(checked)
+
+    added = [(rng.choice(['venue', 'artist']), entities + number, rng.sample(range(1, GENRES + 1), rng.randint(1, 4)))
+             for number in range(lookups)]
+    started = time.perf_counter()
+    for kind, entity_id, genre_ids in added:
+        index.add(kind, entity_id, genre_ids, True)
+    add = (time.perf_counter() - started) / lookups
+    started = time.perf_counter()
+    for kind, entity_id, genre_ids in added:
+        index.remove(kind, entity_id)
+    remove = (time.perf_counter() - started) / lookups
+    # Lists that held a removed entity are rebuilt on their next read
+    started = time.perf_counter()
+    for kind, entity_id in sample:
+        index.matches(kind, entity_id)
+    relookup = (time.perf_counter() - started) / lookups
+    for kind, entity_id in checked:
+        assert index.matches(kind, entity_id) == naive_matches(rows, kind, entity_id), (kind, entity_id)
+
+    # Edits move existing entities, low ids included, between lists
+    for number in range(200):
+        kind = rng.choice(['venue', 'artist'])
+        position = rng.randrange(len(rows[kind]))
+        entity_id = rows[kind][position][0]
+        rows[kind][position] = (entity_id, True, rng.sample(range(1, GENRES + 1), rng.randint(1, 4)))
+        index.add(kind, entity_id, rows[kind][position][2], True)
+    for kind, entity_id in checked:
+        assert index.matches(kind, entity_id) == naive_matches(rows, kind, entity_id), (kind, entity_id)
+
+    print('%d entities: build %.0f ms' % (entities, built * 1000))
+    print('lookup %.1f us, naive scan %.1f ms (%.0fx)' % (indexed * 1e6, naive * 1000, naive / indexed))
+    print('add %.0f us, remove %.0f us, lookup after removes %.1f us' % (add * 1e6, remove * 1e6, relookup * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
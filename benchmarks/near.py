@@ -0,0 +1,83 @@
+"""Benchmark for /venues/near (see geo.py).
+
+Fills a fresh SQLite file, or the empty database at
+$FYYUR_BENCH_DATABASE_URL, with venues scattered around the gazetteer's
+cities, more of them around the first cities listed. It then times
+geo.nearby() from random cities against a full scan that reads every
+located venue and ranks it by haversine distance, the way a query without
+the geocell index would, and checks that both return the same venues.
+
+    python -m benchmarks.near [number_of_venues] [lookups] [radius_km]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.catalog import zipf_weights
+from importer import insert_rows
+from models import db, Venue
+import geo
+
+BATCH = 10000
+LIMIT = 50
+
+
+def _cities():
+    return list(geo._read_places(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'us_cities.csv')))
+
+
+def populate(venues, cities, seed=1):
+    rng = random.Random(seed)
+    weights = zipf_weights(len(cities), 1.0)
+    for start in range(0, venues, BATCH):
+        rows = []
+        for number in range(start, min(start + BATCH, venues)):
+            city, state, latitude, longitude = rng.choices(cities, cum_weights=weights)[0]
+            latitude, longitude = latitude + rng.gauss(0, 0.15), longitude + rng.gauss(0, 0.15)
+            rows.append({'name': 'Venue {}'.format(number), 'city': city, 'state': state,
+                         'latitude': latitude, 'longitude': longitude, 'geocell': geo.geocell(latitude, longitude)})
+        insert_rows(Venue.__table__, rows)
+        db.session.commit()
+
+
+def full_scan(latitude, longitude, radius_km, limit):
+    rows = db.session.query(Venue.id, Venue.latitude, Venue.longitude).filter(Venue.latitude != None)
+    ranked = sorted((geo.haversine_km(latitude, longitude, row.latitude, row.longitude), row.id) for row in rows)
+    return [venue_id for distance, venue_id in ranked if distance <= radius_km][:limit]
+
+
+def main(venues=100000, lookups=200, radius_km=25):
+    from app import app
+    database_url = os.environ.get('FYYUR_BENCH_DATABASE_URL') or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'near.db')
+    app.config.update(SQLALCHEMY_DATABASE_URI=database_url, QUERY_AUDIT='')
+    with app.app_context():
+        db.create_all()
+        cities = _cities()
+        started = time.perf_counter()
+        populate(venues, cities)
+        filled = time.perf_counter() - started
+
+        rng = random.Random(1)
+        points = [rng.choice(cities)[2:] for _ in range(lookups)]
+        found = 0
+        started = time.perf_counter()
+        for latitude, longitude in points:
+            found += len(geo.nearby(latitude, longitude, radius_km, LIMIT))
+        indexed = (time.perf_counter() - started) / lookups
+
+        checked = points[:5]
+        started = time.perf_counter()
+        for latitude, longitude in checked:
+            expected = full_scan(latitude, longitude, radius_km, LIMIT)
+            assert [row.id for distance, row in geo.nearby(latitude, longitude, radius_km, LIMIT)] == expected, (latitude, longitude)
+        scan = (time.perf_counter() - started) / len(checked)
+
+    print('%d venues in %.1f s' % (venues, filled))
+    print('nearby %.2f ms (%.1f venues within %g km), full scan %.0f ms (%.0fx)' % (
+        indexed * 1000, found / lookups, radius_km, scan * 1000, scan / indexed))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if number == 2 else int(arg) for number, arg in enumerate(sys.argv[1:4])])
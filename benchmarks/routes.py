@@ -0,0 +1,218 @@
+"""Route benchmark over a synthetic catalog.
+
+Builds a catalog (see benchmarks/catalog.py) in a fresh SQLite file, or in
+the empty database at $FYYUR_BENCH_DATABASE_URL, which is migrated first.
+It then requests every read route of the app through the Flask test client.
+Detail routes are called with ids drawn by popularity, so hot venues come
+up more often. For each route it reports p50/p95/p99 latency, queries per
+request and the peak memory allocated while serving one request. Write
+routes (create, edit, delete) are left out.
+
+    python -m benchmarks.routes [--shows N] [--requests N] [--output FILE]
+                                [--baseline FILE] [--save-baseline]
+
+Exits with status 1 if, compared with the --baseline results, a route's
+p95 grew by more than --tolerance (and --min-delta-ms) or it ran more
+queries. The committed benchmarks/baseline.json is a default run on
+SQLite. Query counts compare anywhere, but latencies are only comparable
+on the machine that took the baseline: run with --save-baseline there
+first, and commit a new baseline whenever a change is meant to move them.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event
+
+from benchmarks.catalog import CITIES, generate, zipf_weights
+
+SKIPPED_ENDPOINTS = {'static', 'metrics', 'page_cache_stats'}
+WARMUP = 5
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _routes(app):
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint in SKIPPED_ENDPOINTS:
+            continue
+        if 'GET' in rule.methods:
+            yield rule, 'GET'
+        elif 'POST' in rule.methods and rule.endpoint.startswith('search'):
+            yield rule, 'POST'
+
+
+def _request_factory(app, rule, method, catalog, rng):
+    venue_ids, artist_ids, show_ids, names = catalog
+    venue_weights = zipf_weights(len(venue_ids), 1.1)
+    artist_weights = zipf_weights(len(artist_ids), 0.8)
+    pickers = {
+        'venue_id': lambda: rng.choices(venue_ids, cum_weights=venue_weights)[0],
+        'artist_id': lambda: rng.choices(artist_ids, cum_weights=artist_weights)[0],
+        'show_id': lambda: rng.choice(show_ids),
+    }
+
+    urls = app.url_map.bind('localhost')
+
+    def make():
+        path = urls.build(rule.endpoint, {argument: pickers[argument]() for argument in rule.arguments}, method=method)
+        term = rng.choice(names).split()[rng.randint(0, 1)]
+        if method == 'POST':
+            return path, {'method': 'POST', 'data': {'search_term': term}}
+        if rule.endpoint.startswith('api.search'):
+            return path, {'query_string': {'q': term}}
+        if rule.endpoint == 'venues_near':
+            state = rng.choice(sorted(CITIES))
+            return path, {'query_string': {'city': rng.choice(CITIES[state]), 'state': state}}
+        return path, {}
+    return make
+
+
+def measure(client, make, requests, statements):
+    # Template compilation and first-use caches are not what is being measured
+    for _ in range(WARMUP):
+        path, options = make()
+        client.open(path, **options).get_data()
+
+    latencies, queries, statuses = [], [], set()
+    for _ in range(requests):
+        path, options = make()
+        statements[0] = 0
+        started = time.perf_counter()
+        response = client.open(path, **options)
+        response.get_data()
+        latencies.append(time.perf_counter() - started)
+        queries.append(statements[0])
+        statuses.add(response.status_code)
+
+    peak = 0
+    tracemalloc.start()
+    for _ in range(min(requests, 5)):
+        path, options = make()
+        tracemalloc.reset_peak()
+        client.open(path, **options).get_data()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+        'queries': round(sum(queries) / len(queries), 2),
+        'max_queries': max(queries),
+        'peak_kib': round(peak / 1024, 1),
+        'statuses': sorted(statuses),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for route, current in results['routes'].items():
+        previous = baseline['routes'].get(route)
+        if previous is None:
+            continue
+        if current['p95_ms'] > max(previous['p95_ms'] * (1 + tolerance), previous['p95_ms'] + min_delta_ms):
+            regressions.append('{}: p95 {} ms, baseline {} ms'.format(route, current['p95_ms'], previous['p95_ms']))
+        if current['max_queries'] > previous['max_queries']:
+            regressions.append('{}: {} queries, baseline {}'.format(route, current['max_queries'], previous['max_queries']))
+    return regressions
+
+
+def run(shows, requests, seed):
+    from app import app, page_cache
+    from models import db, Venue
+    from flask_migrate import upgrade
+
+    database_url = os.environ.get('FYYUR_BENCH_DATABASE_URL')
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app.config.update(SQLALCHEMY_DATABASE_URI=database_url, WTF_CSRF_ENABLED=False, QUERY_AUDIT='', METRICS_DIR='')
+
+    with app.app_context():
+        if database_url.startswith('sqlite'):
+            db.create_all()
+        else:
+            upgrade(directory=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations'))
+        started = time.perf_counter()
+        venue_ids, artist_ids, show_ids = generate(shows, seed)
+        generated = time.perf_counter() - started
+        names = [name for name, in db.session.query(Venue.name).limit(1000)]
+        catalog = (venue_ids, artist_ids, show_ids, names)
+
+        statements = [0]
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(*args):
+            statements[0] += 1
+
+        client = app.test_client()
+        rng = random.Random(seed)
+        routes = {}
+        for rule, method in _routes(app):
+            page_cache.clear()
+            make = _request_factory(app, rule, method, catalog, rng)
+            routes['{} {}'.format(method, rule.rule)] = measure(client, make, requests, statements)
+            print('{:<45} p50 {p50_ms:>8} ms  p95 {p95_ms:>8} ms  p99 {p99_ms:>8} ms  {queries:>6} queries  {peak_kib:>8} KiB'.format(
+                '{} {}'.format(method, rule.rule), **routes['{} {}'.format(method, rule.rule)]))
+        dialect = db.engine.dialect.name
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': dialect,
+            'shows': len(show_ids),
+            'venues': len(venue_ids),
+            'artists': len(artist_ids),
+            'requests': requests,
+            'seed': seed,
+            'catalog_seconds': round(generated, 1),
+        },
+        'routes': routes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every read route over a synthetic catalog.')
+    parser.add_argument('--shows', type=int, default=10000, help='catalog size, 1000 to 1000000 shows')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmarks/results.json')
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative p95 growth')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='p95 growth always allowed, to absorb noise on fast routes')
+    args = parser.parse_args(argv)
+
+    results = run(args.shows, args.requests, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        return 0
+    if not os.path.exists(args.baseline):
+        print('no baseline at {}, run with --save-baseline to store one'.format(args.baseline))
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['meta']['shows'] != results['meta']['shows'] or baseline['meta']['database'] != results['meta']['database']:
+        print('baseline was taken with {shows} shows on {database}, results may not compare'.format(**baseline['meta']))
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+from bisect import bisect_right
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, event, inspect, select
+from sqlalchemy.engine import Engine
+
+from models import DEFAULT_SHOW_LENGTH, Show
+
+
+# A venue hosts one show at a time and an artist plays one show at a time:
+# no two shows of the same venue, or of the same artist, may have
+# overlapping [start_time, end_time) ranges. On PostgreSQL this is enforced
+# by two exclusion constraints over tsrange(start_time, end_time), backed by
+# GiST indexes (see the migration). A conflicting INSERT or UPDATE fails
+# there and is raised as BookingConflict, however many workers book at once.
+# Elsewhere (SQLite) the mapper events below look for a clash in the
+# database, in the transaction that writes the show, so writes from other
+# workers and processes are seen. SQLite lets one transaction write at a
+# time. Core inserts (the importer) check a whole batch with find_clashes(),
+# one query against the database, and PendingBookings within the batch.
+
+OWNERS = (('venue', Show.venue_id), ('artist', Show.artist_id))
+CONSTRAINT_OWNERS = {'ex_Show_venue_id_overlap': 'venue', 'ex_Show_artist_id_overlap': 'artist'}
+
+
+class BookingConflict(Exception):
+    """A show overlaps another show at the same venue or of the same artist."""
+
+
+def _owners_of(venue_id, artist_id):
+    return [(kind, column, owner_id) for (kind, column), owner_id in zip(OWNERS, (venue_id, artist_id)) if owner_id is not None]
+
+
+def _conflict(kind, start, end):
+    return BookingConflict('the {} is already booked from {:%Y-%m-%d %H:%M} to {:%Y-%m-%d %H:%M}'.format(kind, start, end))
+
+
+def find_clash(connection, column, owner_id, start, end, show_id=None):
+    """(start_time, end_time) of a show of the owner overlapping [start, end), or None."""
+    # The shows of one owner never overlap, so ordered by start time their end
+    # times are ordered too: if any show overlaps, the last one starting
+    # before `end` does. One lookup on ix_Show_venue_id_start_time or
+    # ix_Show_artist_id_start_time.
+    query = select([Show.start_time, Show.end_time]).where(column == owner_id).where(Show.start_time < end)
+    if show_id is not None:
+        query = query.where(Show.id != show_id)
+    latest = connection.execute(query.order_by(Show.start_time.desc()).limit(1)).first()
+    return (latest.start_time, latest.end_time) if latest is not None and latest.end_time > start else None
+
+
+def check_booking(connection, venue_id, artist_id, start, end, show_id=None):
+    """Raises BookingConflict if [start, end) overlaps another show of the venue or artist."""
+    for kind, column, owner_id in _owners_of(venue_id, artist_id):
+        clash = find_clash(connection, column, owner_id, start, end, show_id)
+        if clash:
+            raise _conflict(kind, *clash)
+
+
+# Rows of one import batch, for find_clashes() to join against
+_batch = Table(
+    'booking_batch', MetaData(),
+    Column('ordinal', Integer, primary_key=True),
+    Column('venue_id', Integer),
+    Column('artist_id', Integer),
+    Column('start_time', DateTime),
+    Column('end_time', DateTime),
+    prefixes=['TEMPORARY'],
+)
+
+
+def _latest_before_end(column, batch_column, field):
+    # The latest show of the batch row's owner starting before the row ends,
+    # as in find_clash; one index seek per row
+    return select([field]).where(column == batch_column).where(Show.start_time < _batch.c.end_time).order_by(
+        Show.start_time.desc()).limit(1).as_scalar()
+
+
+def find_clashes(connection, shows):
+    """{index: BookingConflict} for the shows (dicts of venue_id, artist_id,
+    start_time and end_time) that overlap a show in the database, keyed by
+    their index in the list. The shows go into a temporary table and are
+    checked by one query."""
+    if not shows:
+        return {}
+    _batch.create(connection)
+    try:
+        connection.execute(_batch.insert(), [dict(
+            ordinal=position, venue_id=show['venue_id'], artist_id=show['artist_id'],
+            start_time=show['start_time'], end_time=show['end_time'],
+        ) for position, show in enumerate(shows)])
+        owners = [(kind, column, getattr(_batch.c, column.key)) for kind, column in OWNERS]
+        query = select([_batch.c.ordinal, _batch.c.start_time] + [
+            _latest_before_end(column, batch_column, field).label('{}_{}'.format(kind, field.key))
+            for kind, column, batch_column in owners for field in (Show.start_time, Show.end_time)
+        ])
+        clashes = {}
+        for row in connection.execute(query):
+            for kind, column, batch_column in owners:
+                end = row['{}_end_time'.format(kind)]
+                if end is not None and end > row.start_time:
+                    clashes[row.ordinal] = _conflict(kind, row['{}_start_time'.format(kind)], end)
+                    break
+        return clashes
+    finally:
+        _batch.drop(connection)
+
+
+class PendingBookings(object):
+    # The shows of one import batch, checked against the rows accepted before
+    # them in the batch, which are not written yet (find_clashes covers the
+    # database). Per owner, the accepted ranges are kept in start order.
+
+    def __init__(self):
+        self._owners = {}
+
+    def book(self, venue_id, artist_id, start, end):
+        """Accepts a show, or raises BookingConflict if it overlaps one."""
+        owners = _owners_of(venue_id, artist_id)
+        for kind, column, owner_id in owners:
+            starts, ends = self._owners.get((kind, owner_id), ((), ()))
+            position = bisect_right(starts, start)
+            if position and ends[position - 1] > start:
+                raise _conflict(kind, starts[position - 1], ends[position - 1])
+            if position < len(starts) and starts[position] < end:
+                raise _conflict(kind, starts[position], ends[position])
+        for kind, column, owner_id in owners:
+            starts, ends = self._owners.setdefault((kind, owner_id), ([], []))
+            position = bisect_right(starts, start)
+            starts.insert(position, start)
+            ends.insert(position, end)
+
+
+def _enforced_here(connection):
+    return connection.dialect.name != 'postgresql'
+
+
+@event.listens_for(Show, 'before_insert')
+def _fill_end_time(mapper, connection, target):
+    if target.end_time is None and target.start_time is not None:
+        target.end_time = target.start_time + DEFAULT_SHOW_LENGTH
+
+
+# Checked once the row is written, so shows inserted by the same flush see
+# each other; raising rolls the flush back
+@event.listens_for(Show, 'after_insert')
+@event.listens_for(Show, 'after_update')
+def _check_show(mapper, connection, target):
+    state = inspect(target)
+    moved = not state.has_identity or any(
+        state.attrs[name].history.has_changes() for name in ('venue_id', 'artist_id', 'start_time', 'end_time'))
+    if moved and _enforced_here(connection):
+        check_booking(connection, target.venue_id, target.artist_id, target.start_time, target.end_time, target.id)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _exclusion_violation(context):
+    error = context.original_exception
+    if getattr(error, 'pgcode', None) == '23P01':
+        kind = CONSTRAINT_OWNERS.get(error.diag.constraint_name)
+        if kind:
+            raise BookingConflict('the {} is already booked at that time'.format(kind)) from error
@@ -1,8 +1,30 @@
 import os
-SECRET_KEY = os.urandom(32)
+import tempfile
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def _shared_secret_key(path):
+    # The first worker to start writes a random key; the others read that one
+    if not os.path.exists(path):
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), delete=False) as f:
+            f.write(os.urandom(32).hex())
+        try:
+            os.link(f.name, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(f.name)
+    with open(path) as f:
+        return bytes.fromhex(f.read().strip())
+
+
+# Every worker and node must sign sessions with the same key. Set FYYUR_SECRET_KEY
+# when running on several nodes; otherwise the workers of one node share a key
+# generated into FYYUR_SECRET_KEY_FILE.
+SECRET_KEY = os.environ.get('FYYUR_SECRET_KEY') or _shared_secret_key(
+    os.environ.get('FYYUR_SECRET_KEY_FILE', os.path.join(basedir, '.secret_key')))
+
 # Enable debug mode.
 DEBUG = True
 
@@ -11,3 +33,73 @@ DEBUG = True
 
 # TODO IMPLEMENT DATABASE URL (done)
 SQLALCHEMY_DATABASE_URI = 'postgresql://alex@localhost:5432/FyyurDB'
+
+# Connection pool (see pooling.py). Connections are pinged before use and replaced
+# after DB_POOL_RECYCLE seconds. Set FYYUR_DB_PGBOUNCER=1 behind PgBouncer in
+# transaction pooling mode to leave pooling to it.
+DB_POOL_SIZE = int(os.environ.get('FYYUR_DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('FYYUR_DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('FYYUR_DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('FYYUR_DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('FYYUR_DB_POOL_PRE_PING', '1') == '1'
+DB_PGBOUNCER = os.environ.get('FYYUR_DB_PGBOUNCER', '0') == '1'
+
+# Listing pages (/venues, /artists, /shows) are paged with keyset cursors.
+# ?per_page= may override PAGE_SIZE up to MAX_PAGE_SIZE.
+PAGE_SIZE = int(os.environ.get('FYYUR_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.environ.get('FYYUR_MAX_PAGE_SIZE', 200))
+
+# 'database' searches with PostgreSQL full-text/trigram indexes (LIKE elsewhere);
+# 'ngram' matches names against an in-process index rebuilt every SEARCH_INDEX_MAX_AGE seconds.
+SEARCH_BACKEND = os.environ.get('FYYUR_SEARCH_BACKEND', 'database')
+SEARCH_INDEX_MAX_AGE = int(os.environ.get('FYYUR_SEARCH_INDEX_MAX_AGE', 300))
+
+# Venue/artist matches on the detail pages come from an in-process index (see
+# matchmaking.py) that is reloaded from the database every MATCH_INDEX_MAX_AGE seconds.
+MATCH_INDEX_MAX_AGE = int(os.environ.get('FYYUR_MATCH_INDEX_MAX_AGE', 300))
+
+# Venues are located by city and state from the memory-mapped gazetteer at GAZETTEER_PATH
+# (see geo.py). /venues/near searches NEAR_RADIUS_KM around a point unless asked for up to NEAR_MAX_RADIUS_KM.
+GAZETTEER_PATH = os.environ.get('FYYUR_GAZETTEER_PATH', os.path.join(basedir, 'data', 'us_cities.gaz'))
+NEAR_RADIUS_KM = float(os.environ.get('FYYUR_NEAR_RADIUS_KM', 25))
+NEAR_MAX_RADIUS_KM = float(os.environ.get('FYYUR_NEAR_MAX_RADIUS_KM', 250))
+
+# Identifies the deployed code in every ETag (see freshness.py). Set it, e.g. to the commit
+# being deployed, when several nodes serve the site; otherwise each node uses its git
+# revision plus the mtimes of its templates and modules, which differ between checkouts.
+RELEASE = os.environ.get('FYYUR_RELEASE', '')
+
+# Rendered venue/artist detail pages kept per worker; entries also expire after PAGE_CACHE_TTL seconds.
+PAGE_CACHE_SIZE = int(os.environ.get('FYYUR_PAGE_CACHE_SIZE', 1024))
+PAGE_CACHE_TTL = int(os.environ.get('FYYUR_PAGE_CACHE_TTL', 300))
+
+# Fingerprinted static URLs (see assets.py) are cached by browsers for ASSET_MAX_AGE seconds.
+ASSET_MAX_AGE = int(os.environ.get('FYYUR_ASSET_MAX_AGE', 31536000))
+
+# Compiled templates are kept in TEMPLATE_CACHE_DIR and shared by the workers (see
+# template_cache.py); `flask templates compile` fills it at deploy time. Empty disables the cache.
+TEMPLATE_CACHE_DIR = os.environ.get('FYYUR_TEMPLATE_CACHE_DIR', os.path.join(basedir, '.template_cache'))
+
+# JSON logs (see logs.py). LOG_LEVELS takes per-logger overrides such as
+# "app=DEBUG,sqlalchemy.engine=INFO"; only LOG_DEBUG_SAMPLE_RATE of DEBUG records are kept.
+LOG_FILE = os.environ.get('FYYUR_LOG_FILE', '' if DEBUG else 'error.log')
+LOG_LEVEL = os.environ.get('FYYUR_LOG_LEVEL', 'INFO')
+LOG_LEVELS = os.environ.get('FYYUR_LOG_LEVELS', '')
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('FYYUR_LOG_DEBUG_SAMPLE_RATE', 0.01))
+
+# /metrics (see metrics.py). With several worker processes point METRICS_DIR at a
+# directory they share; each process writes its samples there every METRICS_FLUSH_INTERVAL seconds.
+METRICS_DIR = os.environ.get('FYYUR_METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = int(os.environ.get('FYYUR_METRICS_FLUSH_INTERVAL', 5))
+
+# 'log' or 'raise' on likely N+1 queries and exceeded @query_budget limits (see query_audit.py);
+# empty disables the checks. A statement repeated N_PLUS_ONE_THRESHOLD times in one request is flagged.
+QUERY_AUDIT = os.environ.get('FYYUR_QUERY_AUDIT', 'log' if DEBUG else '')
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('FYYUR_N_PLUS_ONE_THRESHOLD', 5))
+
+# Keep session data (flash messages) server-side in this database instead of in the
+# cookie (see session_store.py), e.g. the main PostgreSQL database shared by all nodes,
+# whose migrations create the table, or sqlite:////var/lib/fyyur/sessions.db after
+# `flask sessions create-table`. Non-permanent sessions expire after SESSION_STORE_TTL seconds.
+SESSION_STORE_URI = os.environ.get('FYYUR_SESSION_STORE_URI', '')
+SESSION_STORE_TTL = int(os.environ.get('FYYUR_SESSION_STORE_TTL', 86400))
@@ -1,7 +1,10 @@
 from datetime import datetime
 from flask_wtf import Form
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms.validators import DataRequired, AnyOf, URL, Optional, ValidationError
+
+# Seconds are optional, the show form's placeholder leaves them out
+SHOW_TIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M']
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -13,8 +16,19 @@ class ShowForm(Form):
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
+        format=SHOW_TIME_FORMATS,
         default= datetime.today()
     )
+    # left empty, the show runs for models.DEFAULT_SHOW_LENGTH
+    end_time = DateTimeField(
+        'end_time',
+        validators=[Optional()],
+        format=SHOW_TIME_FORMATS
+    )
+
+    def validate_end_time(self, field):
+        if field.data and self.start_time.data and field.data <= self.start_time.data:
+            raise ValidationError('End time must be after the start time.')
 
 class VenueForm(Form):
     name = StringField(
@@ -0,0 +1,251 @@
+import functools
+import hashlib
+import os
+from datetime import datetime
+from itertools import chain
+
+from flask import Response, current_app, g, make_response, request, session
+from sqlalchemy import case, event, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from matchmaking import OTHER, MODELS, match_index
+from models import db, Artist, Show, Venue, table_versions
+
+
+# Conditional GET for the HTML pages. Each page declares a freshness function
+# that returns a few cheap aggregates over the rows it renders: row count
+# (catches deletes), max(updated_at) (catches inserts and updates) and, for
+# shows, the latest start_time already passed plus the next one to come (the
+# past/upcoming split moves when a show starts). These are hashed into the
+# ETag. Last-Modified is the newest updated_at or passed start_time. A
+# request whose validators match is answered with 304 before the view runs.
+#
+# Aggregates over whole tables would cost every listing request a scan, so
+# the listing pages read table versions instead: one row per table in
+# table_versions, bumped with the time of the change once a transaction
+# that wrote the table commits, deletes included. Core writes register
+# their tables with touch_on_commit(). The bump runs in a transaction of
+# its own, so no writer holds the version row; a reader that sees the new
+# rows before the new version only revalidates once more.
+# Their schedule split is two index lookups on Show.start_time. Detail
+# pages also list matches from the in-process index (see matchmaking.py),
+# so their ids and rows are part of those pages' validators.
+
+VERSIONED = (Venue, Artist, Show)
+
+# Templates, view code and the fingerprinted static URLs are part of every
+# page, so a deploy must change every ETag. RELEASE is set by init_app from
+# the RELEASE setting, which makes ETags agree across nodes, or else from
+# the checked-out git revision and the newest mtime of the templates and
+# modules, which catches uncommitted edits. Static files are covered by the
+# asset manifest, which hashed them at startup anyway.
+RELEASE = ''
+
+
+def _git_revision(root):
+    # Read from .git directly; running git would cost more than the rest of startup
+    git = os.path.join(root, '.git')
+    try:
+        with open(os.path.join(git, 'HEAD')) as f:
+            head = f.read().strip()
+        if not head.startswith('ref: '):
+            return head
+        ref = head[len('ref: '):]
+        if os.path.exists(os.path.join(git, ref)):
+            with open(os.path.join(git, ref)) as f:
+                return f.read().strip()
+        with open(os.path.join(git, 'packed-refs')) as f:
+            for line in f:
+                if line.rstrip().endswith(' ' + ref):
+                    return line.split()[0]
+    except OSError:
+        pass
+    return ''
+
+
+def _newest_source(root):
+    newest = max((entry.stat().st_mtime_ns for entry in os.scandir(root) if entry.name.endswith('.py')), default=0)
+    for directory, subdirectories, files in os.walk(os.path.join(root, 'templates')):
+        newest = max([newest] + [os.stat(os.path.join(directory, name)).st_mtime_ns for name in files])
+    return newest
+
+
+def init_app(app):
+    global RELEASE
+    assets = app.extensions.get('assets')
+    release = (app.config['RELEASE'],) if app.config['RELEASE'] else (_git_revision(app.root_path), _newest_source(app.root_path))
+    static = sorted(assets.urls.items()) if assets is not None else ()
+    RELEASE = hashlib.md5(repr((release, static)).encode('utf-8')).hexdigest()
+
+
+def entity_state(model, *criteria):
+    return db.session.query(func.count(model.id), func.max(model.updated_at)).filter(*criteria).one()
+
+
+def show_state(*criteria):
+    now = datetime.now()
+    return db.session.query(
+        func.count(Show.id),
+        func.max(Show.updated_at),
+        func.max(case([(Show.start_time <= now, Show.start_time)])),
+        func.min(case([(Show.start_time > now, Show.start_time)])),
+    ).filter(*criteria).one()
+
+
+def match_state(kind, entity_id):
+    # The matches on a detail page: their ids from this process's index, and
+    # the rows they are rendered from
+    ids = match_index.matches(kind, entity_id)
+    if not ids:
+        return ()
+    model = MODELS[OTHER[kind]]
+    return (tuple(ids),) + tuple(entity_state(model, model.id.in_(ids)))
+
+
+def listing_state(*models):
+    # Same shape as show_state: (versions, last change, passed, next)
+    now = datetime.now()
+    versions = db.session.query(table_versions.c.name, table_versions.c.version, table_versions.c.changed_at).filter(
+        table_versions.c.name.in_([model.__tablename__ for model in models])).order_by(table_versions.c.name).all()
+    passed, upcoming = db.session.query(
+        db.session.query(func.max(Show.start_time)).filter(Show.start_time <= now).as_scalar(),
+        db.session.query(func.min(Show.start_time)).filter(Show.start_time > now).as_scalar(),
+    ).one()
+    changed = max((changed_at for name, version, changed_at in versions), default=None)
+    return tuple((name, version) for name, version, changed_at in versions), changed, passed, upcoming
+
+
+def touch(connection, *models):
+    """Bumps the versions of the models' tables in the connection's transaction."""
+    now = datetime.now()
+    for name in sorted(model.__tablename__ for model in models):
+        updated = connection.execute(table_versions.update().where(table_versions.c.name == name).values(
+            version=table_versions.c.version + 1, changed_at=now)).rowcount
+        if updated:
+            continue
+        values = {'name': name, 'version': 1, 'changed_at': now}
+        if connection.dialect.name == 'postgresql':
+            connection.execute(pg_insert(table_versions).values(values).on_conflict_do_update(
+                index_elements=[table_versions.c.name],
+                set_={'version': table_versions.c.version + 1, 'changed_at': now}))
+        else:
+            connection.execute(table_versions.insert().values(values))
+
+
+WRITTEN = 'freshness_written'
+
+
+def touch_on_commit(session, *models):
+    """Bumps the versions of the models' tables once the session commits.
+    Writes that bypass the ORM call it themselves."""
+    session.info.setdefault(WRITTEN, set()).update(models)
+
+
+@event.listens_for(Session, 'after_flush')
+def _flushed(session, flush_context):
+    # new, dirty and deleted still hold what this flush wrote
+    written = {type(instance) for instance in chain(session.new, session.deleted)}
+    written.update(type(instance) for instance in session.dirty if session.is_modified(instance))
+    models = [model for model in VERSIONED if model in written]
+    if models:
+        touch_on_commit(session, *models)
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _bulk_written(context):
+    if context.mapper.class_ in VERSIONED:
+        touch_on_commit(context.session, context.mapper.class_)
+
+
+@event.listens_for(Session, 'after_commit')
+def _committed(session):
+    # A transaction of its own, one short UPDATE per table. Bumped inside the
+    # writing transaction, the row would be locked until that commits and
+    # every writer to the table would queue behind it.
+    models = session.info.pop(WRITTEN, None)
+    if not models:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            touch(connection, *models)
+    except Exception:
+        # The rows are committed; the pages catch up at the next write
+        current_app.logger.exception('could not bump the versions of %s', sorted(model.__tablename__ for model in models))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _rolled_back(session):
+    session.info.pop(WRITTEN, None)
+
+
+def validators(*states):
+    # Returns (etag, last_modified) for the given entity_state/show_state results
+    etag = hashlib.md5(repr((RELEASE,) + states).encode('utf-8')).hexdigest()
+    moments = [value for state in states for value in state[1:3] if isinstance(value, datetime)]
+    return etag, max(moments, default=None)
+
+
+def conditional(freshness):
+    # freshness(**view_args) returns validators(...) for the page
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if '_flashes' in session:
+                # Pages carrying flash messages are one-offs
+                return view(*args, **kwargs)
+
+            etag, last_modified = freshness(*args, **kwargs)
+            # Views may key their own caches on it, see show_venue()
+            g.page_etag = etag
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def static_page():
+    return validators()
+
+
+def venues_page():
+    return validators(listing_state(Venue, Show))
+
+
+def artists_page():
+    return validators(listing_state(Artist, Show))
+
+
+def shows_page():
+    return validators(listing_state(Show, Venue, Artist))
+
+
+def venue_page(venue_id):
+    return validators(
+        entity_state(Venue, Venue.id == venue_id),
+        show_state(Show.venue_id == venue_id),
+        entity_state(Artist, Artist.id.in_(db.session.query(Show.artist_id).filter(Show.venue_id == venue_id))),
+        match_state('venue', venue_id),
+    )
+
+
+def artist_page(artist_id):
+    return validators(
+        entity_state(Artist, Artist.id == artist_id),
+        show_state(Show.artist_id == artist_id),
+        entity_state(Venue, Venue.id.in_(db.session.query(Show.venue_id).filter(Show.artist_id == artist_id))),
+        match_state('artist', artist_id),
+    )
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from models import db, Genre
+
+
+# Process-wide lookup of the (effectively read-only) Genre table: lower-cased
+# name to id and id to name. Create handlers turn submitted genre names into
+# association rows without querying Genre, and read paths turn association
+# rows into names without joining it. The registry reloads when it is older
+# than max_age, or at the next lookup after this process writes a Genre row.
+# Call refresh() to reload on demand.
+
+class GenreRegistry(object):
+
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._ids_by_name = {}
+        self._names_by_id = {}
+        self.loaded_at = None
+
+    def refresh(self):
+        rows = db.session.query(Genre.id, Genre.name).all()
+        with self._lock:
+            self._ids_by_name = {(name or '').lower(): genre_id for genre_id, name in rows}
+            self._names_by_id = {genre_id: name for genre_id, name in rows}
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def _current(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.max_age:
+            self.refresh()
+        return self._ids_by_name, self._names_by_id
+
+    def ids_for(self, names):
+        # Unknown names are skipped, as the old Genre.name IN (...) lookup did
+        ids_by_name = self._current()[0]
+        ids = (ids_by_name.get(name.lower()) for name in names)
+        return list(dict.fromkeys(genre_id for genre_id in ids if genre_id is not None))
+
+    def names_for(self, ids):
+        names_by_id = self._current()[1]
+        return [names_by_id[genre_id] for genre_id in ids if genre_id in names_by_id]
+
+    def names_by_owner(self, owner_column, owner_ids):
+        # Genre names for many owners from one query against the association
+        # table, e.g. names_by_owner(artist_genres.c.artist_id, [1, 2, 3])
+        owner_ids = list(owner_ids)
+        genre_ids = defaultdict(list)
+        if owner_ids:
+            genre_column = owner_column.table.c.genre_id
+            rows = db.session.query(owner_column, genre_column).filter(owner_column.in_(owner_ids))
+            for owner_id, genre_id in rows:
+                genre_ids[owner_id].append(genre_id)
+        return {owner_id: self.names_for(genre_ids[owner_id]) for owner_id in owner_ids}
+
+
+genre_registry = GenreRegistry()
+
+
+@event.listens_for(Genre, 'after_insert')
+@event.listens_for(Genre, 'after_update')
+@event.listens_for(Genre, 'after_delete')
+def _genre_changed(mapper, connection, target):
+    genre_registry.invalidate()
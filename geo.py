@@ -0,0 +1,247 @@
+import csv
+import math
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, or_
+
+from models import db, Venue
+
+
+# Venue locations and proximity search without PostGIS. A venue's city and
+# state are looked up in an offline US gazetteer when it is written, which
+# fills Venue.latitude, longitude and geocell. The geocell is the venue's
+# cell in a fixed grid of 0.01 degree squares, about 1.1 km north to south,
+# numbered row by row. nearby() turns the bounding box of its search circle
+# into one range of cell numbers per grid row, which the ix_Venue_geocell
+# index answers. It then asks the database for the venues in those ranges
+# and the box, closest first by a flat-earth distance, and re-ranks them by
+# exact haversine distance.
+#
+# The gazetteer is a sorted table of fixed-width records (see
+# write_gazetteer) that is memory-mapped at startup and searched in place.
+# The bundled data/us_cities.gaz holds the larger US cities and is built
+# from data/us_cities.csv. `flask gazetteer build FILE` rebuilds it from
+# that CSV format or from a Census Bureau Gazetteer places file
+# (2020_Gaz_place_national.txt). `flask gazetteer locate-venues` fills the
+# location of venues written before it existed.
+
+gazetteer_cli = AppGroup('gazetteer', help='Build the city gazetteer and locate venues.')
+
+MAGIC = b'FYGZ'
+HEADER = struct.Struct('<4sHI')
+RECORD = struct.Struct('<2s32sii')
+KEY_SIZE = 34
+MICRODEGREES = 1000000
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+CELLS_PER_DEGREE = 100
+COLUMNS = 360 * CELLS_PER_DEGREE
+# Fractions of the radius that nearby() searches, one query each
+SEARCH_STEPS = (1 / 16, 1 / 4, 1)
+
+# Trailing words of Census place names ("Austin city", "Brooklyn CDP")
+PLACE_SUFFIXES = {'city', 'town', 'village', 'borough', 'cdp', 'municipality', 'township'}
+
+gazetteer = None
+
+
+def _normalize(city):
+    words = city.lower().replace('.', ' ').split()
+    if words and words[0] in ('st', 'ste'):
+        words[0] = 'saint' if words[0] == 'st' else 'sainte'
+    return ' '.join(words)
+
+
+def _key(city, state):
+    return (state or '').strip().upper().encode('ascii', 'replace')[:2].ljust(2, b'\0') + \
+        _normalize(city or '').encode('utf-8')[:32].ljust(32, b'\0')
+
+
+def write_gazetteer(rows, path):
+    """Writes (city, state, latitude, longitude) rows as a gazetteer file: a
+    header, then one 42-byte record per place sorted by state and city name,
+    with coordinates in microdegrees."""
+    records = {}
+    for city, state, latitude, longitude in rows:
+        records.setdefault(_key(city, state), (round(latitude * MICRODEGREES), round(longitude * MICRODEGREES)))
+    # Renamed into place: running processes keep mapping the old file
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, RECORD.size, len(records)))
+        for key in sorted(records):
+            f.write(RECORD.pack(key[:2], key[2:], *records[key]))
+    os.replace(path + '.tmp', path)
+    return len(records)
+
+
+class Gazetteer(object):
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, self._count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError('{} is not a gazetteer file'.format(path))
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        # The record keys, so bisect can search the mapped file directly
+        offset = HEADER.size + position * RECORD.size
+        return self._map[offset:offset + KEY_SIZE]
+
+    def locate(self, city, state):
+        """(latitude, longitude) of a city, or None if it is not listed."""
+        key = _key(city, state)
+        position = bisect_left(self, key)
+        if position == self._count or self[position] != key:
+            return None
+        latitude, longitude = struct.unpack_from('<ii', self._map, HEADER.size + position * RECORD.size + KEY_SIZE)
+        return latitude / MICRODEGREES, longitude / MICRODEGREES
+
+    def close(self):
+        self._map.close()
+
+
+def geocell(latitude, longitude):
+    row = min(int(math.floor((latitude + 90) * CELLS_PER_DEGREE)), 180 * CELLS_PER_DEGREE - 1)
+    column = int(math.floor((longitude + 180) * CELLS_PER_DEGREE)) % COLUMNS
+    return row * COLUMNS + column
+
+
+def location_values(city, state):
+    # Venue column values for a city, all None when it cannot be located
+    location = gazetteer.locate(city, state) if gazetteer is not None else None
+    if location is None:
+        return {'latitude': None, 'longitude': None, 'geocell': None}
+    return {'latitude': location[0], 'longitude': location[1], 'geocell': geocell(*location)}
+
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude):
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    a = (math.sin((other_phi - phi) / 2) ** 2 +
+         math.cos(phi) * math.cos(other_phi) * math.sin(math.radians(other_longitude - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    latitude_delta = radius_km / KM_PER_DEGREE
+    longitude_delta = min(180.0, radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)))
+    return (max(latitude - latitude_delta, -90.0), min(latitude + latitude_delta, 90.0),
+            longitude - longitude_delta, longitude + longitude_delta)
+
+
+def cell_ranges(box):
+    # One (first, last) geocell range per grid row the box covers; a box
+    # crossing the antimeridian gets two ranges per row
+    south, north, west, east = box
+    first_row, last_row = geocell(south, 0) // COLUMNS, geocell(north, 0) // COLUMNS
+    if east - west >= 360:
+        columns = [(0, COLUMNS - 1)]
+    else:
+        first_column, last_column = geocell(0, west) % COLUMNS, geocell(0, east) % COLUMNS
+        columns = [(first_column, last_column)] if first_column <= last_column else [(first_column, COLUMNS - 1), (0, last_column)]
+    return [(row * COLUMNS + first, row * COLUMNS + last) for row in range(first_row, last_row + 1) for first, last in columns]
+
+
+def _within(latitude, longitude, radius_km, limit):
+    box = bounding_box(latitude, longitude, radius_km)
+    south, north, west, east = box
+    # Equirectangular distance squared, in degrees of latitude: close enough
+    # to order candidates in SQL, which has no trigonometry on SQLite
+    scale = math.cos(math.radians(latitude)) ** 2
+    flat_distance = (Venue.latitude - latitude) * (Venue.latitude - latitude) + \
+        (Venue.longitude - longitude) * (Venue.longitude - longitude) * scale
+    query = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, Venue.image_link, Venue.latitude, Venue.longitude).filter(
+        or_(*[Venue.geocell.between(first, last) for first, last in cell_ranges(box)]),
+        Venue.latitude.between(south, north),
+    )
+    if -180 <= west and east < 180:
+        query = query.filter(Venue.longitude.between(west, east))
+    # A few extra rows absorb the difference between the two distances
+    rows = query.order_by(flat_distance, Venue.id).limit(limit * 2 + 10)
+    ranked = sorted(((haversine_km(latitude, longitude, row.latitude, row.longitude), row) for row in rows),
+                    key=lambda ranked_row: (ranked_row[0], ranked_row[1].id))
+    return [(distance, row) for distance, row in ranked if distance <= radius_km][:limit]
+
+
+def nearby(latitude, longitude, radius_km, limit):
+    """Venues within radius_km of a point as (distance_km, row) pairs, closest first."""
+    # The database reads every venue in the box, which is a lot of them
+    # downtown. Smaller circles are searched first, and `limit` venues in
+    # one of them are the closest in the whole circle.
+    for step in SEARCH_STEPS:
+        found = _within(latitude, longitude, radius_km * step, limit)
+        if len(found) == limit:
+            break
+    return found
+
+
+@event.listens_for(Venue, 'before_insert')
+@event.listens_for(Venue, 'before_update')
+def _locate_venue(mapper, connection, target):
+    state = inspect(target)
+    if state.has_identity and not any(state.attrs[name].history.has_changes() for name in ('city', 'state')):
+        return
+    if not state.has_identity and target.latitude is not None:
+        return
+    for name, value in location_values(target.city, target.state).items():
+        setattr(target, name, value)
+
+
+def _read_places(path):
+    # (city, state, latitude, longitude) rows from our CSV or a Census places file
+    with open(path, newline='', encoding='utf-8') as f:
+        dialect = 'excel-tab' if '\t' in f.readline() else 'excel'
+        f.seek(0)
+        for row in csv.DictReader(f, dialect=dialect):
+            row = {(key or '').strip(): (value or '').strip() for key, value in row.items()}
+            if 'USPS' in row:
+                words = row['NAME'].split(' ')
+                if len(words) > 1 and words[-1].lower() in PLACE_SUFFIXES:
+                    words = words[:-1]
+                yield ' '.join(words), row['USPS'], float(row['INTPTLAT']), float(row['INTPTLONG'])
+            else:
+                yield row['city'], row['state'], float(row['latitude']), float(row['longitude'])
+
+
+@gazetteer_cli.command('build', help='Compile a places CSV or Census Gazetteer file into GAZETTEER_PATH.')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False), required=False)
+def build(path):
+    path = path or os.path.join(current_app.root_path, 'data', 'us_cities.csv')
+    count = write_gazetteer(_read_places(path), current_app.config['GAZETTEER_PATH'])
+    click.echo('{} places written to {}'.format(count, current_app.config['GAZETTEER_PATH']))
+
+
+@gazetteer_cli.command('locate-venues', help='Fill the location of venues that have none.')
+@click.option('--all', 'everything', is_flag=True, help='Relocate every venue, e.g. after rebuilding the gazetteer.')
+def locate_venues(everything):
+    # One UPDATE per distinct city, since venues are located by city
+    areas = db.session.query(Venue.city, Venue.state).distinct()
+    if not everything:
+        areas = areas.filter(Venue.latitude == None)
+    located = missing = 0
+    for city, state in areas.all():
+        values = location_values(city, state)
+        if values['latitude'] is None:
+            missing += 1
+            continue
+        located += db.session.query(Venue).filter(Venue.city == city, Venue.state == state).update(values, synchronize_session=False)
+        db.session.commit()
+    click.echo('{} venues located, {} cities not in the gazetteer'.format(located, missing))
+
+
+def init_app(app):
+    global gazetteer
+    app.cli.add_command(gazetteer_cli)
+    if gazetteer is None and os.path.exists(app.config['GAZETTEER_PATH']):
+        gazetteer = Gazetteer(app.config['GAZETTEER_PATH'])
+    elif gazetteer is None:
+        app.logger.warning('no gazetteer at %s, venues will not be located', app.config['GAZETTEER_PATH'])
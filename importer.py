@@ -0,0 +1,347 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+import click
+from flask.cli import AppGroup
+from werkzeug.datastructures import MultiDict
+
+from forms import ArtistForm, ShowForm, VenueForm
+from freshness import touch_on_commit
+from bookings import BookingConflict, PendingBookings, find_clashes
+from genre_registry import genre_registry
+from geo import location_values
+from models import DEFAULT_SHOW_LENGTH, db, Artist, Show, Venue, artist_genres, venue_genres
+import show_counts
+import show_listing
+
+
+# `flask import <kind> FILE` streams a CSV or NDJSON (.ndjson/.jsonl) file,
+# validates every row with the same form the web handler uses and writes
+# accepted rows in batches, one transaction per batch. On PostgreSQL each
+# batch is a single psycopg2 execute_values statement; elsewhere it falls
+# back to SQLAlchemy executemany. Shows and genre links skip rows that are
+# already present, so re-running a file is safe: genre links through ON
+# CONFLICT DO NOTHING, shows by looking up the batch's (venue, artist,
+# start time) keys first. A show that overlaps another booking of its venue
+# or artist is rejected, on every database (see bookings.py): PostgreSQL's
+# exclusion constraints check a batch as it is written, elsewhere one query
+# per batch does. Show count rollups are refreshed after each batch commits,
+# in a short transaction of their own.
+#
+# In CSV files `genres` is a ';'-separated list. Show start_time and the
+# optional end_time use the ShowForm format, e.g. 2026-05-21 21:30:00.
+
+import_cli = AppGroup('import', help='Bulk-load venues, artists, shows and genre links.')
+
+
+def _read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _genre_names(value):
+    if isinstance(value, list):
+        return value
+    return [name.strip() for name in (value or '').split(';') if name.strip()]
+
+
+def _formdata(row):
+    formdata = MultiDict()
+    for key, value in row.items():
+        if key == 'genres':
+            for name in _genre_names(value):
+                formdata.add(key, name)
+        elif isinstance(value, bool):
+            # BooleanField reads any submitted value as checked
+            if value:
+                formdata.add(key, 'y')
+        elif value is not None:
+            formdata.add(key, str(value))
+    return formdata
+
+
+def _validate(form_class, row):
+    form = form_class(formdata=_formdata(row), meta={'csrf': False})
+    return form, form.validate()
+
+
+def insert_rows(table, rows, returning=False, ignore_conflicts=False, conflict_target=()):
+    # Bulk INSERT of rows (dicts with the same keys) on the session's
+    # connection, also used by the benchmark catalog builders. Returns the new
+    # ids when returning=True, otherwise the number of rows written. On
+    # PostgreSQL conflict_target limits the conflicts ignored to the unique
+    # index on those columns; other violations still raise.
+    connection = db.session.connection()
+    columns = list(rows[0])
+    if connection.dialect.name == 'postgresql':
+        from psycopg2.extras import execute_values
+        sql = 'INSERT INTO "{}" ({}) VALUES %s'.format(table.name, ', '.join(columns))
+        if ignore_conflicts and conflict_target:
+            sql += ' ON CONFLICT ({}) DO NOTHING'.format(', '.join(conflict_target))
+        elif ignore_conflicts:
+            sql += ' ON CONFLICT DO NOTHING'
+        if returning:
+            sql += ' RETURNING id'
+        values = [tuple(row[column] for column in columns) for row in rows]
+        with connection.connection.cursor() as cursor:
+            result = execute_values(cursor, sql, values, page_size=len(values), fetch=returning)
+            return [new_id for new_id, in result] if returning else cursor.rowcount
+
+    statement = table.insert()
+    if ignore_conflicts and connection.dialect.name == 'sqlite':
+        statement = statement.prefix_with('OR IGNORE')
+    if returning:
+        return [connection.execute(statement, row).inserted_primary_key[0] for row in rows]
+    return connection.execute(statement, rows).rowcount
+
+
+def _existing_ids(model, ids):
+    return {entity_id for entity_id, in db.session.query(model.id).filter(model.id.in_(set(ids)))}
+
+
+SHOW_KEY = ('venue_id', 'artist_id', 'start_time')
+# session.info key of the venue and artist ids whose show counts need a refresh
+SHOW_OWNERS = 'import_show_owners'
+
+
+def _existing_shows(shows):
+    # The (venue_id, artist_id, start_time) keys of the shows already booked
+    # among them, from uq_Show_venue_id_artist_id_start_time
+    if not shows:
+        return set()
+    query = db.session.query(Show.venue_id, Show.artist_id, Show.start_time).filter(
+        Show.venue_id.in_({show['venue_id'] for show in shows}),
+        Show.start_time.in_({show['start_time'] for show in shows}),
+    )
+    return {tuple(row) for row in query}
+
+
+def _venue_values(form):
+    # Core inserts skip the ORM events, so venues are located here (see geo.py)
+    return dict(location_values(form.city.data, form.state.data), **{
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'address': form.address.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'website_link': form.website_link.data,
+        'seeking_talent': bool(form.seeking_talent.data),
+        'seeking_description': form.seeking_description.data,
+    })
+
+
+def _artist_values(form):
+    return {
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'website_link': form.website_link.data,
+        'seeking_venue': bool(form.seeking_venue.data),
+        'seeking_description': form.seeking_description.data,
+    }
+
+
+def _load_entities(model, form_class, values, link_table, owner, batch):
+    accepted, genre_ids, rejected = [], [], []
+    for line, row in batch:
+        form, valid = _validate(form_class, row)
+        if not valid:
+            rejected.append((line, form.errors))
+            continue
+        accepted.append(values(form))
+        genre_ids.append(genre_registry.ids_for(form.genres.data))
+    if not accepted:
+        return 0, rejected
+    new_ids = insert_rows(model.__table__, accepted, returning=True)
+    links = [{owner: new_id, 'genre_id': genre_id} for new_id, ids in zip(new_ids, genre_ids) for genre_id in ids]
+    if links:
+        insert_rows(link_table, links, ignore_conflicts=True)
+    return len(accepted), rejected
+
+
+def _load_venues(batch):
+    return _load_entities(Venue, VenueForm, _venue_values, venue_genres, 'venue_id', batch)
+
+
+def _load_artists(batch):
+    return _load_entities(Artist, ArtistForm, _artist_values, artist_genres, 'artist_id', batch)
+
+
+def _load_shows(batch):
+    accepted, rejected = [], []
+    for line, row in batch:
+        form, valid = _validate(ShowForm, row)
+        errors = dict(form.errors)
+        for field in ('venue_id', 'artist_id'):
+            if not str(getattr(form, field).data or '').isdigit():
+                errors[field] = ['Must be an existing id.']
+        if errors:
+            rejected.append((line, errors))
+            continue
+        accepted.append((line, {
+            'venue_id': int(form.venue_id.data),
+            'artist_id': int(form.artist_id.data),
+            'start_time': form.start_time.data,
+            'end_time': form.end_time.data or form.start_time.data + DEFAULT_SHOW_LENGTH,
+        }))
+    # Core inserts bypass the ORM events that copy the names onto Show rows
+    venues = show_listing.copies_by_id(Venue, show_listing.VENUE_COPIES, [show['venue_id'] for line, show in accepted])
+    artists = show_listing.copies_by_id(Artist, show_listing.ARTIST_COPIES, [show['artist_id'] for line, show in accepted])
+    # Shows already booked, in the database or earlier in the batch, are
+    # skipped; only the rest are checked for overlaps, which a show always
+    # has with itself
+    booked = _existing_shows([show for line, show in accepted])
+    candidates = []
+    for line, show in accepted:
+        key = tuple(show[column] for column in SHOW_KEY)
+        if key in booked:
+            continue
+        if show['venue_id'] not in venues or show['artist_id'] not in artists:
+            rejected.append((line, {'venue_id/artist_id': ['No such venue or artist.']}))
+            continue
+        booked.add(key)
+        show.update(venues[show['venue_id']])
+        show.update(artists[show['artist_id']])
+        candidates.append((line, show))
+    if not candidates:
+        return 0, rejected
+
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # The exclusion constraints check the batch as it is written. Only a
+        # batch they refuse is checked here, to tell which rows to reject.
+        from psycopg2.errors import ExclusionViolation
+        savepoint = connection.begin_nested()
+        try:
+            written = _insert_shows([show for line, show in candidates])
+            savepoint.commit()
+        except ExclusionViolation:
+            savepoint.rollback()
+            shows = _without_overlaps(connection, candidates, rejected)
+            written = _insert_shows(shows) if shows else 0
+        else:
+            shows = [show for line, show in candidates]
+    else:
+        shows = _without_overlaps(connection, candidates, rejected)
+        written = _insert_shows(shows) if shows else 0
+    db.session.info.setdefault(SHOW_OWNERS, (set(), set()))
+    db.session.info[SHOW_OWNERS][0].update(show['venue_id'] for show in shows)
+    db.session.info[SHOW_OWNERS][1].update(show['artist_id'] for show in shows)
+    return written, rejected
+
+
+def _without_overlaps(connection, candidates, rejected):
+    # One query finds the rows overlapping shows in the database,
+    # PendingBookings the ones overlapping earlier rows of the batch
+    clashes = find_clashes(connection, [show for line, show in candidates])
+    bookings = PendingBookings()
+    shows = []
+    for position, (line, show) in enumerate(candidates):
+        try:
+            if position in clashes:
+                raise clashes[position]
+            bookings.book(show['venue_id'], show['artist_id'], show['start_time'], show['end_time'])
+        except BookingConflict as e:
+            rejected.append((line, {'start_time/end_time': ['Overlaps another show: {}.'.format(e)]}))
+            continue
+        shows.append(show)
+    return shows
+
+
+def _insert_shows(shows):
+    # A show booked by another writer since _existing_shows() is skipped. An
+    # overlap booked meanwhile fails the batch, instead of being dropped.
+    return insert_rows(Show.__table__, shows, ignore_conflicts=True, conflict_target=SHOW_KEY)
+
+
+def _refresh_show_counts():
+    # The rollups of the owners of the shows written by the last batch, in a
+    # transaction of their own: on PostgreSQL refresh() locks both rollup
+    # tables, which would otherwise block show writes for a whole batch
+    venue_ids, artist_ids = db.session.info.pop(SHOW_OWNERS, (set(), set()))
+    if venue_ids or artist_ids:
+        show_counts.refresh(venue_ids, artist_ids)
+        db.session.commit()
+
+
+def _genre_link_loader(model, link_table, owner):
+    def load(batch):
+        accepted, rejected = [], []
+        for line, row in batch:
+            names = _genre_names(row.get('genres') or row.get('genre'))
+            genre_ids = genre_registry.ids_for(names)
+            if not str(row.get(owner) or '').isdigit() or len(genre_ids) != len({name.lower() for name in names}) or not names:
+                rejected.append((line, {owner + '/genres': ['Needs an existing id and known genre names.']}))
+                continue
+            accepted.append((line, int(row[owner]), genre_ids))
+        owner_ids = _existing_ids(model, [owner_id for line, owner_id, genre_ids in accepted])
+        links = []
+        for line, owner_id, genre_ids in accepted:
+            if owner_id in owner_ids:
+                links.extend({owner: owner_id, 'genre_id': genre_id} for genre_id in genre_ids)
+            else:
+                rejected.append((line, {owner: ['No such id.']}))
+        if not links:
+            return 0, rejected
+        return insert_rows(link_table, links, ignore_conflicts=True), rejected
+    return load
+
+
+def _run(kind, load, model, path, batch_size, after_commit=None):
+    rows = enumerate(_read_rows(path), start=1)
+    written = rejected = 0
+    started = time.monotonic()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        try:
+            count, errors = load(batch)
+            if count:
+                # Core inserts skip the ORM flush that bumps the table's version
+                touch_on_commit(db.session, model)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            click.echo('{}: batch starting at row {} failed, {} rows written before it'.format(kind, batch[0][0], written), err=True)
+            raise
+        if after_commit is not None:
+            after_commit()
+        written += count
+        rejected += len(errors)
+        for line, error in errors:
+            click.echo('{}: row {} rejected: {}'.format(kind, line, json.dumps(error)), err=True)
+        elapsed = time.monotonic() - started
+        click.echo('{}: {} rows read, {} written, {} rejected ({:.0f} rows/s)'.format(
+            kind, batch[-1][0], written, rejected, batch[-1][0] / elapsed if elapsed else 0))
+    if rejected:
+        sys.exit(1)
+
+
+def _command(kind, load, model, after_commit=None):
+    @import_cli.command(kind, help='Import {} from a CSV or NDJSON file.'.format(kind.replace('-', ' ')))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT and transaction.')
+    def command(path, batch_size):
+        _run(kind, load, model, path, batch_size, after_commit)
+    return command
+
+
+_command('venues', _load_venues, Venue)
+_command('artists', _load_artists, Artist)
+_command('shows', _load_shows, Show, _refresh_show_counts)
+_command('venue-genres', _genre_link_loader(Venue, venue_genres, 'venue_id'), Venue)
+_command('artist-genres', _genre_link_loader(Artist, artist_genres, 'artist_id'), Artist)
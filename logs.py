@@ -0,0 +1,112 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+from flask.logging import default_handler
+
+
+# Logging without I/O on the request path. Loggers hand records to a
+# QueueHandler on the root logger; a QueueListener thread formats them as
+# one JSON object per line and writes them to LOG_FILE (stderr when empty).
+# Messages use logging's %-style arguments, so a disabled level costs one
+# isEnabledFor() check and the arguments are never formatted. DEBUG records
+# are sampled at LOG_DEBUG_SAMPLE_RATE because they tend to carry payloads.
+#
+# LOG_LEVELS sets per-logger levels, e.g. "app=DEBUG,sqlalchemy.engine=INFO".
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+
+    def prepare(self, record):
+        # Resolves the message and traceback while the arguments are still
+        # current; the listener thread does the JSON encoding and the write
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestContextFilter(logging.Filter):
+    # Runs in the thread that logs, before the request context is gone
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class DebugSampler(logging.Filter):
+
+    def __init__(self, rate):
+        super(DebugSampler, self).__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+def _parse_levels(value):
+    levels = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(app):
+    config = app.config
+    if config['LOG_FILE']:
+        target = logging.FileHandler(config['LOG_FILE'])
+    else:
+        target = logging.StreamHandler(sys.stderr)
+    target.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(DebugSampler(config['LOG_DEBUG_SAMPLE_RATE']))
+    listener = QueueListener(records, target, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(config['LOG_LEVEL'])
+    app.logger.removeHandler(default_handler)
+    for name, level in _parse_levels(config['LOG_LEVELS']).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    # Flushes what is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,267 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from heapq import merge
+from itertools import groupby
+
+from flask import current_app, request
+from sqlalchemy import case
+
+from models import db, Artist, Venue, artist_genres, venue_genres
+
+
+# Matches venues seeking talent with artists seeking a venue. Every venue
+# and artist is reduced to a bitset of its genre ids (bit n for genre n).
+# Seeking entities are grouped by bitset, and for each bitset on the other
+# side the index keeps the best LIMIT candidates, ranked by the number of
+# shared genres and then by id. A venue or artist page looks up the list of
+# its own bitset, so serving matches costs the same with 100 entities or
+# 100,000. A list is built from the candidate bitsets containing each
+# subset of the page's genres, largest subsets first, and stops once it is
+# full; neither entities nor bitsets are scanned.
+#
+# The create and delete handlers update the index in place. A new seeking
+# entity is merged into every list it belongs on. A removed one drops the
+# lists that held it, and those are rebuilt on their next read. As with the
+# n-gram search index, each process holds its own copy and reloads it from
+# the database once it is older than MATCH_INDEX_MAX_AGE. The reload runs in
+# a background thread started by the first detail page request to find the
+# index stale; requests keep reading the current index until the new one is
+# swapped in. A new worker lists no matches until its first build is done.
+
+LIMIT = 6
+# Bitsets with more genres than this are scored one by one instead of
+# through the subset map, which would hold 2 ** genres entries for them
+MAX_SUBSET_GENRES = 8
+OTHER = {'venue': 'artist', 'artist': 'venue'}
+MODELS = {'venue': Venue, 'artist': Artist}
+ENDPOINTS = ('show_venue', 'show_artist')
+
+
+def genre_bits(genre_ids):
+    bits = 0
+    for genre_id in genre_ids:
+        bits |= 1 << genre_id
+    return bits
+
+
+def _count(bits):
+    return bin(bits).count('1')
+
+
+def _subsets(bits):
+    # Every non-empty subset of bits
+    subset = bits
+    while subset:
+        yield subset
+        subset = (subset - 1) & bits
+
+
+class _Candidates(object):
+    # The seeking venues or artists: sorted ids per bitset, and a map from
+    # every subset of a bitset to the bitsets containing it, so the bitsets
+    # sharing exactly n genres with another are found without a scan
+
+    def __init__(self):
+        self.groups = {}
+        self.supersets = defaultdict(set)
+        self.wide = set()
+
+    def add(self, bits, entity_id):
+        group = self.groups.get(bits)
+        if group is None:
+            group = self.groups[bits] = []
+            if _count(bits) > MAX_SUBSET_GENRES:
+                self.wide.add(bits)
+            else:
+                for subset in _subsets(bits):
+                    self.supersets[subset].add(bits)
+        insort(group, entity_id)
+
+    def remove(self, bits, entity_id):
+        group = self.groups[bits]
+        del group[bisect_left(group, entity_id)]
+        if group:
+            return
+        del self.groups[bits]
+        if bits in self.wide:
+            self.wide.discard(bits)
+            return
+        for subset in _subsets(bits):
+            self.supersets[subset].discard(bits)
+            if not self.supersets[subset]:
+                del self.supersets[subset]
+
+    def rank(self, bits, limit):
+        """(-shared genres, id) of the best `limit` candidates for bits."""
+        levels = defaultdict(list)
+        for group_bits in self.wide:
+            if group_bits & bits:
+                levels[_count(group_bits & bits)].append(group_bits)
+        if _count(bits) > MAX_SUBSET_GENRES:
+            for group_bits in self.groups:
+                if group_bits & bits and group_bits not in self.wide:
+                    levels[_count(group_bits & bits)].append(group_bits)
+        else:
+            # Walks the subsets of bits from the largest down; a bitset first
+            # reached through a subset of n genres shares exactly n
+            seen = set()
+            by_size = sorted(_subsets(bits), key=_count, reverse=True)
+            for size, subsets in groupby(by_size, key=_count):
+                for subset in subsets:
+                    for group_bits in self.supersets.get(subset, ()):
+                        if group_bits not in seen:
+                            seen.add(group_bits)
+                            levels[size].append(group_bits)
+                if sum(len(self.groups[group_bits]) for level in levels if level >= size for group_bits in levels[level]) >= limit:
+                    break
+        ranked = []
+        for shared in sorted(levels, reverse=True):
+            for entity_id in merge(*[self.groups[group_bits] for group_bits in levels[shared]]):
+                ranked.append((-shared, entity_id))
+                if len(ranked) == limit:
+                    return ranked
+        return ranked
+
+
+class MatchIndex(object):
+
+    def __init__(self, limit=LIMIT):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._bits = {'venue': {}, 'artist': {}}
+        self._seekers = {'venue': {}, 'artist': {}}
+        self._candidates = {'venue': _Candidates(), 'artist': _Candidates()}
+        self._ranked = {'venue': {}, 'artist': {}}
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._bits['venue']) + len(self._bits['artist'])
+
+    def build(self, venues, artists):
+        # venues and artists are (id, seeking, genre_ids) rows; the new index
+        # is swapped in atomically with the lists of every bitset precomputed
+        bits, seekers, candidates = {}, {}, {}
+        for kind, rows in (('venue', venues), ('artist', artists)):
+            bits[kind], seekers[kind], candidates[kind] = {}, {}, _Candidates()
+            for entity_id, seeking, genre_ids in rows:
+                entity_bits = bits[kind][entity_id] = genre_bits(genre_ids)
+                if seeking and entity_bits:
+                    seekers[kind][entity_id] = entity_bits
+                    candidates[kind].add(entity_bits, entity_id)
+        ranked = {kind: {entity_bits: candidates[OTHER[kind]].rank(entity_bits, self.limit)
+                         for entity_bits in set(bits[kind].values()) if entity_bits}
+                  for kind in bits}
+        with self._lock:
+            self._bits, self._seekers, self._candidates, self._ranked = bits, seekers, candidates, ranked
+            self.built_at = time.monotonic()
+
+    def matches(self, kind, entity_id):
+        """Ids of the best matches of the other kind for a venue or artist."""
+        with self._lock:
+            bits = self._bits[kind].get(entity_id)
+            if not bits:
+                return []
+            ranked = self._ranked[kind].get(bits)
+            if ranked is None:
+                ranked = self._ranked[kind][bits] = self._candidates[OTHER[kind]].rank(bits, self.limit)
+            return [entity_id for shared, entity_id in ranked]
+
+    def add(self, kind, entity_id, genre_ids, seeking):
+        bits = genre_bits(genre_ids)
+        with self._lock:
+            self._remove(kind, entity_id)
+            self._bits[kind][entity_id] = bits
+            if not (seeking and bits):
+                return
+            self._seekers[kind][entity_id] = bits
+            self._candidates[kind].add(bits, entity_id)
+            for list_bits, ranked in self._ranked[OTHER[kind]].items():
+                if not list_bits & bits:
+                    continue
+                entry = (-_count(list_bits & bits), entity_id)
+                if len(ranked) < self.limit or entry < ranked[-1]:
+                    insort(ranked, entry)
+                    del ranked[self.limit:]
+
+    def remove(self, kind, entity_id):
+        with self._lock:
+            self._remove(kind, entity_id)
+
+    def _remove(self, kind, entity_id):
+        self._bits[kind].pop(entity_id, None)
+        bits = self._seekers[kind].pop(entity_id, None)
+        if bits is None:
+            return
+        self._candidates[kind].remove(bits, entity_id)
+        ranked_lists = self._ranked[OTHER[kind]]
+        for list_bits in [list_bits for list_bits, ranked in ranked_lists.items()
+                          if list_bits & bits and any(ranked_id == entity_id for shared, ranked_id in ranked)]:
+            del ranked_lists[list_bits]
+
+    def is_stale(self, max_age):
+        return self.built_at is None or time.monotonic() - self.built_at > max_age
+
+
+match_index = MatchIndex()
+
+
+def _rows(kind):
+    model = MODELS[kind]
+    owner_column = venue_genres.c.venue_id if kind == 'venue' else artist_genres.c.artist_id
+    seeking_column = model.seeking_talent if kind == 'venue' else model.seeking_venue
+    genre_ids = defaultdict(list)
+    for owner_id, genre_id in db.session.query(owner_column, owner_column.table.c.genre_id):
+        genre_ids[owner_id].append(genre_id)
+    return [(entity_id, seeking, genre_ids[entity_id]) for entity_id, seeking in db.session.query(model.id, seeking_column)]
+
+
+_rebuilding = threading.Lock()
+
+
+def _rebuild(app):
+    try:
+        with app.app_context():
+            match_index.build(_rows('venue'), _rows('artist'))
+    except Exception:
+        app.logger.exception('match index rebuild failed')
+    finally:
+        _rebuilding.release()
+
+
+def _refresh():
+    if (request.endpoint in ENDPOINTS and match_index.is_stale(current_app.config['MATCH_INDEX_MAX_AGE'])
+            and _rebuilding.acquire(blocking=False)):
+        threading.Thread(target=_rebuild, args=(current_app._get_current_object(),), name='match-index', daemon=True).start()
+
+
+def _kind(entity):
+    return 'venue' if isinstance(entity, Venue) else 'artist'
+
+
+def best_matches(entity):
+    # One query for the names and pictures of the matched ids, best first
+    ids = match_index.matches(_kind(entity), entity.id)
+    if not ids:
+        return []
+    model = MODELS[OTHER[_kind(entity)]]
+    position = case({entity_id: i for i, entity_id in enumerate(ids)}, value=model.id)
+    rows = db.session.query(model.id, model.name, model.image_link, model.city, model.state).filter(
+        model.id.in_(ids)).order_by(position)
+    return [{"id": row.id, "name": row.name, "image_link": row.image_link, "city": row.city, "state": row.state}
+            for row in rows]
+
+
+def match_entity(entity, genre_ids):
+    # Called by the write handlers after commit, like search.index_entity
+    seeking = entity.seeking_talent if isinstance(entity, Venue) else entity.seeking_venue
+    match_index.add(_kind(entity), entity.id, genre_ids, bool(seeking))
+
+
+def unmatch_entity(model, entity_id):
+    match_index.remove('venue' if model is Venue else 'artist', entity_id)
+
+
+def init_app(app):
+    app.before_request(_refresh)
@@ -0,0 +1,274 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Prometheus text-format metrics at /metrics. Every request records its
+# latency, the number and total time of its SQL statements (engine events),
+# the time spent rendering its template and the response size, labelled by
+# endpoint. Samples live in a lock-protected dict per process.
+#
+# With several worker processes, set METRICS_DIR to a directory shared by
+# them. Each process then writes its samples there at most every
+# METRICS_FLUSH_INTERVAL seconds, and /metrics adds up the files. Every
+# sample is a counter, so the files of processes that have exited are
+# folded into aggregate.json and removed when /metrics is collected:
+# counters survive worker restarts and the directory holds one file per
+# live worker. Folding runs under an flock on the directory's lock file.
+# The directory must be local to one host, since workers are told apart
+# by pid.
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+AGGREGATE = 'aggregate.json'
+LOCK = 'metrics.lock'
+
+
+class Histogram(object):
+
+    def __init__(self, registry, name, help, labelnames, buckets):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._registry = registry
+        registry.metrics.append(self)
+
+    def observe(self, value, *labels):
+        # Values are per-bucket counts (not cumulative), then sum and count
+        index = bisect_left(self.buckets, value)
+        with self._registry.lock:
+            values = self._registry.samples.get((self.name, labels))
+            if values is None:
+                values = self._registry.samples[(self.name, labels)] = [0] * (len(self.buckets) + 3)
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+
+class Registry(object):
+
+    def __init__(self):
+        self.metrics = []
+        self.directory = None
+        self.flush_interval = 5
+        self.flushed_at = 0
+        self.pid = None
+        self.check_pid()
+
+    def check_pid(self):
+        # A worker forked from a process that already recorded samples starts
+        # from zero, under its own file name
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._filename = '{}-{}.json'.format(self.pid, int(time.time() * 1000))
+            self.lock = threading.Lock()
+            self.samples = {}
+
+    def snapshot(self):
+        with self.lock:
+            return [[name, list(labels), list(values)] for (name, labels), values in self.samples.items()]
+
+    def flush(self):
+        if self.directory is None:
+            return
+        self.check_pid()
+        self.flushed_at = time.monotonic()
+        _write(os.path.join(self.directory, self._filename), self.snapshot())
+
+    def maybe_flush(self):
+        if self.directory is not None and time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def collect(self):
+        # Own samples plus those other processes wrote to the shared directory
+        self.check_pid()
+        snapshots = [self.snapshot()]
+        if self.directory is not None:
+            with open(os.path.join(self.directory, LOCK), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                snapshots.extend(self._fold_exited())
+        return _merge(snapshots)
+
+    def _fold_exited(self):
+        # Snapshots of the directory, after folding the files of exited
+        # processes into the aggregate. The aggregate lists the files it
+        # holds until they are gone, so a crash between writing it and
+        # removing them does not count them twice.
+        aggregate = _read(os.path.join(self.directory, AGGREGATE)) or {'samples': [], 'folded': []}
+        names = set(os.listdir(self.directory))
+        folded = [name for name in aggregate['folded'] if name in names]
+        snapshots, exited = [], []
+        for name in sorted(names):
+            if not name.endswith('.json') or name in (AGGREGATE, self._filename) or name in folded:
+                continue
+            snapshot = _read(os.path.join(self.directory, name))
+            if snapshot is None:
+                continue
+            (snapshots if _running(name) else exited).append((name, snapshot))
+        if exited:
+            samples = _merge([aggregate['samples']] + [snapshot for name, snapshot in exited])
+            aggregate = {'samples': [[metric, list(labels), values] for (metric, labels), values in samples.items()],
+                         'folded': folded + [name for name, snapshot in exited]}
+            _write(os.path.join(self.directory, AGGREGATE), aggregate)
+            for name, snapshot in exited:
+                os.remove(os.path.join(self.directory, name))
+        elif len(folded) != len(aggregate['folded']):
+            aggregate['folded'] = folded
+            _write(os.path.join(self.directory, AGGREGATE), aggregate)
+        return [aggregate['samples']] + [snapshot for name, snapshot in snapshots]
+
+    def render(self):
+        merged = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.help))
+            lines.append('# TYPE {} histogram'.format(metric.name))
+            for (name, labels), values in sorted(merged.items()):
+                if name != metric.name:
+                    continue
+                pairs = ['{}="{}"'.format(key, _escape(value)) for key, value in zip(metric.labelnames, labels)]
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ('+Inf',), values):
+                    cumulative += count
+                    le = 'le="{}"'.format(bound)
+                    lines.append('{}_bucket{{{}}} {}'.format(name, ','.join(pairs + [le]), cumulative))
+                lines.append('{}_sum{{{}}} {}'.format(name, ','.join(pairs), values[-2]))
+                lines.append('{}_count{{{}}} {}'.format(name, ','.join(pairs), values[-1]))
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, values in snapshot:
+            key = (name, tuple(labels))
+            if key in merged:
+                merged[key] = [a + b for a, b in zip(merged[key], values)]
+            else:
+                merged[key] = values
+    return merged
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, data):
+    # Renamed into place, so readers never see a file half written
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+def _running(name):
+    # Sample files are named <pid>-<start ms>.json
+    try:
+        os.kill(int(name.split('-', 1)[0]), 0)
+    except ValueError:
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+registry = Registry()
+
+request_duration = Histogram(registry, 'fyyur_request_duration_seconds', 'Time spent handling a request.',
+                             ('endpoint', 'method', 'status'), LATENCY_BUCKETS)
+sql_statements = Histogram(registry, 'fyyur_request_sql_statements', 'SQL statements executed per request.',
+                           ('endpoint',), COUNT_BUCKETS)
+sql_duration = Histogram(registry, 'fyyur_request_sql_duration_seconds', 'Total SQL time per request.',
+                         ('endpoint',), LATENCY_BUCKETS)
+render_duration = Histogram(registry, 'fyyur_template_render_seconds', 'Time spent rendering a template.',
+                            ('template',), LATENCY_BUCKETS)
+response_size = Histogram(registry, 'fyyur_response_size_bytes', 'Size of the response body.',
+                          ('endpoint',), SIZE_BUCKETS)
+
+
+class TimedTemplate(Template):
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super(TimedTemplate, self).render(*args, **kwargs)
+        finally:
+            render_duration.observe(time.perf_counter() - started, self.name or '<string>')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_started'].pop()
+    if has_request_context() and 'metrics_sql' in g:
+        g.metrics_sql[0] += 1
+        g.metrics_sql[1] += elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get('metrics_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def _start_request():
+    registry.check_pid()
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql = [0, 0.0]
+
+
+def _finish_request(response):
+    if 'metrics_started' not in g:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    request_duration.observe(time.perf_counter() - g.metrics_started, endpoint, request.method, str(response.status_code))
+    statements, seconds = g.metrics_sql
+    sql_statements.observe(statements, endpoint)
+    sql_duration.observe(seconds, endpoint)
+    size = response.calculate_content_length()
+    if size is not None:
+        response_size.observe(size, endpoint)
+    registry.maybe_flush()
+    return response
+
+
+def metrics_view():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    registry.directory = app.config['METRICS_DIR'] or None
+    registry.flush_interval = app.config['METRICS_FLUSH_INTERVAL']
+    if registry.directory is not None:
+        os.makedirs(registry.directory, exist_ok=True)
+        atexit.register(registry.flush)
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,38 @@
+"""add keyset pagination indexes for the listing pages
+
+Revision ID: 22b0945182f9
+Revises: b726841cb07c
+Create Date: 2026-10-18 10:03:27.881640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '22b0945182f9'
+down_revision = 'b726841cb07c'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_Artist_name_id', 'Artist', ['name', 'id']),
+    ('ix_Show_start_time_id', 'Show', ['start_time', 'id']),
+    ('ix_Venue_state_city_id', 'Venue', ['state', 'city', 'id']),
+]
+
+
+def upgrade():
+    # Built concurrently like b726841cb07c; ix_Venue_state_city_id supersedes ix_Venue_state_city
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_Venue_state_city', table_name='Venue', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city'], unique=False, postgresql_concurrently=True)
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
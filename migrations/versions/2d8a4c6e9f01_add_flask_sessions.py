@@ -0,0 +1,35 @@
+"""add the server-side session table
+
+Revision ID: 2d8a4c6e9f01
+Revises: 9b3e6d2f7c15
+Create Date: 2026-10-19 00:12:45.903814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8a4c6e9f01'
+down_revision = '9b3e6d2f7c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Earlier releases created the table at startup when the session store
+    # shared the main database
+    if 'flask_sessions' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table('flask_sessions',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_flask_sessions_expires_at', 'flask_sessions', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_flask_sessions_expires_at', table_name='flask_sessions')
+    op.drop_table('flask_sessions')
@@ -0,0 +1,46 @@
+"""add venue and artist show count rollups
+
+Revision ID: 3e1b7c2a9d44
+Revises: 5c858cdc8c76
+Create Date: 2026-10-18 15:20:11.402317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e1b7c2a9d44'
+down_revision = '5c858cdc8c76'
+branch_labels = None
+depends_on = None
+
+
+ROLLUPS = [('venue_show_counts', 'venue_id', 'Venue'), ('artist_show_counts', 'artist_id', 'Artist')]
+
+
+def upgrade():
+    # The app compares start_time with its local naive datetime.now()
+    now = 'LOCALTIMESTAMP' if op.get_bind().dialect.name == 'postgresql' else "datetime('now', 'localtime')"
+    for table, owner, owner_table in ROLLUPS:
+        op.create_table(table,
+            sa.Column(owner, sa.Integer(), nullable=False),
+            sa.Column('total', sa.Integer(), nullable=False),
+            sa.Column('upcoming', sa.Integer(), nullable=False),
+            sa.Column('next_start', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint([owner], ['{}.id'.format(owner_table)], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint(owner)
+        )
+        op.execute(
+            'INSERT INTO {table} ({owner}, total, upcoming, next_start) '
+            'SELECT o.id, count(s.id), '
+            'sum(CASE WHEN s.start_time > {now} THEN 1 ELSE 0 END), '
+            'min(CASE WHEN s.start_time > {now} THEN s.start_time END) '
+            'FROM "{owner_table}" o LEFT OUTER JOIN "Show" s ON s.{owner} = o.id '
+            'GROUP BY o.id'.format(table=table, owner=owner, owner_table=owner_table, now=now)
+        )
+
+
+def downgrade():
+    for table, owner, owner_table in reversed(ROLLUPS):
+        op.drop_table(table)
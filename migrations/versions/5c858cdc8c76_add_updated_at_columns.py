@@ -0,0 +1,40 @@
+"""add updated_at to Venue, Artist and Show
+
+Revision ID: 5c858cdc8c76
+Revises: 917df4aad2da
+Create Date: 2026-10-18 14:32:50.618093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c858cdc8c76'
+down_revision = '917df4aad2da'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['Venue', 'Artist', 'Show']
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+
+    # Page freshness tokens read max(updated_at), which these indexes answer directly
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index('ix_{}_updated_at'.format(table), table, ['updated_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index('ix_{}_updated_at'.format(table), table_name=table, postgresql_concurrently=True)
+
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,33 @@
+"""add table versions for the listing page validators
+
+Revision ID: 5f2a9c81e4b6
+Revises: c4e82f1b7d93
+Create Date: 2026-10-18 23:04:51.276113
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a9c81e4b6'
+down_revision = 'c4e82f1b7d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_versions = op.create_table('table_versions',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # Rows exist up front, so writers only ever UPDATE them
+    op.bulk_insert(table_versions, [{'name': name, 'version': 1, 'changed_at': datetime.now()} for name in ('Venue', 'Artist', 'Show')])
+
+
+def downgrade():
+    op.drop_table('table_versions')
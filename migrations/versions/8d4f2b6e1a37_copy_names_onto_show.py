@@ -0,0 +1,34 @@
+"""copy artist and venue names onto Show
+
+Revision ID: 8d4f2b6e1a37
+Revises: 3e1b7c2a9d44
+Create Date: 2026-10-18 17:05:12.402915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f2b6e1a37'
+down_revision = '3e1b7c2a9d44'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Wide enough for any Artist.name, Venue.name and Artist.image_link.
+    # Existing rows are filled by `flask shows backfill`, in batches.
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('venue_name', sa.String(), nullable=True))
+        batch_op.alter_column('artist_name', existing_type=sa.String(length=120), type_=sa.String(), existing_nullable=True)
+        batch_op.alter_column('image_link', existing_type=sa.String(length=500), type_=sa.String(length=1000), existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.alter_column('image_link', existing_type=sa.String(length=1000), type_=sa.String(length=500), existing_nullable=True,
+                              postgresql_using='left(image_link, 500)')
+        batch_op.alter_column('artist_name', existing_type=sa.String(), type_=sa.String(length=120), existing_nullable=True,
+                              postgresql_using='left(artist_name, 120)')
+        batch_op.drop_column('venue_name')
@@ -0,0 +1,32 @@
+"""add unique index on Show venue, artist and start time
+
+Revision ID: 917df4aad2da
+Revises: f0a806675ec5
+Create Date: 2026-10-18 13:41:09.227514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '917df4aad2da'
+down_revision = 'f0a806675ec5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Duplicate bookings would block the unique index; keep the oldest row of each
+    op.execute(
+        'DELETE FROM "Show" WHERE id NOT IN ('
+        'SELECT min(id) FROM "Show" GROUP BY venue_id, artist_id, start_time)'
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('uq_Show_venue_id_artist_id_start_time', 'Show', ['venue_id', 'artist_id', 'start_time'],
+                        unique=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('uq_Show_venue_id_artist_id_start_time', table_name='Show', postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""make the keyset pagination keys not null
+
+Revision ID: 9b3e6d2f7c15
+Revises: 5f2a9c81e4b6
+Create Date: 2026-10-18 23:41:07.582316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e6d2f7c15'
+down_revision = '5f2a9c81e4b6'
+branch_labels = None
+depends_on = None
+
+# Columns /venues and /artists page on. A row comparison against a NULL is
+# NULL, so a page ending on such a row had no next page.
+KEYS = {
+    'Venue': [('state', sa.String(length=120)), ('city', sa.String(length=120))],
+    'Artist': [('name', sa.String())],
+}
+
+
+def upgrade():
+    for table, columns in KEYS.items():
+        for column, type_ in columns:
+            op.execute('UPDATE "{0}" SET "{1}" = \'\' WHERE "{1}" IS NULL'.format(table, column))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column, type_ in columns:
+                batch_op.alter_column(column, existing_type=type_, nullable=False)
+
+
+def downgrade():
+    for table, columns in KEYS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column, type_ in columns:
+                batch_op.alter_column(column, existing_type=type_, nullable=True)
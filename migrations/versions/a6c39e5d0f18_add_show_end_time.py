@@ -0,0 +1,84 @@
+"""add Show.end_time and forbid overlapping shows
+
+Revision ID: a6c39e5d0f18
+Revises: 8d4f2b6e1a37
+Create Date: 2026-10-18 18:21:47.530816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c39e5d0f18'
+down_revision = '8d4f2b6e1a37'
+branch_labels = None
+depends_on = None
+
+
+OWNERS = ['venue_id', 'artist_id']
+
+# Existing shows run for models.DEFAULT_SHOW_LENGTH, cut short where the
+# next show at the same venue or of the same artist starts, so the data
+# already satisfies the exclusion constraints when they are built. Shows
+# starting at the same time as another show of their venue or artist have
+# no such range; the upgrade stops until they are moved or deleted.
+SHARED_STARTS = (
+    'SELECT s.id FROM "Show" s WHERE EXISTS (SELECT 1 FROM "Show" o WHERE o.id < s.id AND '
+    'o.start_time = s.start_time AND (o.venue_id = s.venue_id OR o.artist_id = s.artist_id)) ORDER BY s.id'
+)
+POSTGRESQL_END_TIMES = (
+    'UPDATE "Show" s SET end_time = LEAST(s.start_time + interval \'3 hours\', n.next_at_venue_id, n.next_at_artist_id) '
+    'FROM (SELECT id, '
+    'lead(start_time) OVER (PARTITION BY venue_id ORDER BY start_time, id) AS next_at_venue_id, '
+    'lead(start_time) OVER (PARTITION BY artist_id ORDER BY start_time, id) AS next_at_artist_id '
+    'FROM "Show") n WHERE n.id = s.id'
+)
+NEXT_START = (
+    '(SELECT min(o.start_time) FROM "Show" o WHERE o.{owner} = "Show".{owner} AND '
+    'o.start_time > "Show".start_time)'
+)
+SQLITE_END_TIMES = 'UPDATE "Show" SET end_time = min(datetime(start_time, \'+3 hours\'), {})'.format(
+    ', '.join("coalesce({}, '9999-12-31')".format(NEXT_START.format(owner=owner)) for owner in OWNERS))
+
+
+def upgrade():
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    shared = [show_id for show_id, in op.get_bind().execute(sa.text(SHARED_STARTS))]
+    if shared:
+        raise RuntimeError(
+            '{} shows start at the same time as another show of their venue or artist, '
+            'move or delete them and upgrade again: ids {}'.format(len(shared), ', '.join(map(str, shared[:50]))))
+
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('end_time', sa.DateTime(), nullable=True))
+
+    op.execute(POSTGRESQL_END_TIMES if is_postgresql else SQLITE_END_TIMES)
+
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint('ck_Show_end_time', 'end_time > start_time')
+
+    if is_postgresql:
+        # GiST has no integer equality operator class without btree_gist.
+        # The constraints' indexes cannot be built CONCURRENTLY; the table is
+        # locked against writes while they are built.
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for owner in OWNERS:
+            op.execute(
+                'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{owner}_overlap" '
+                'EXCLUDE USING gist ({owner} WITH =, tsrange(start_time, end_time) WITH &&)'.format(owner=owner)
+            )
+
+
+def downgrade():
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    if is_postgresql:
+        for owner in OWNERS:
+            op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_{}_overlap"'.format(owner))
+
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        # SQLite's table copy does not carry CHECK constraints over
+        if is_postgresql:
+            batch_op.drop_constraint('ck_Show_end_time', type_='check')
+        batch_op.drop_column('end_time')
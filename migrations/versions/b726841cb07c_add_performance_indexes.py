@@ -0,0 +1,97 @@
+"""add performance indexes on Show, Venue and the genre association tables
+
+Revision ID: b726841cb07c
+Revises: ae085529db41
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b726841cb07c'
+down_revision = 'ae085529db41'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time']),
+    ('ix_Venue_state_city', 'Venue', ['state', 'city']),
+]
+
+ASSOCIATIONS = [
+    ('venue_genres', 'venue_id'),
+    ('artist_genres', 'artist_id'),
+]
+
+
+def upgrade():
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    # Rows that would violate the new primary keys have to go first
+    for table, owner in ASSOCIATIONS:
+        op.execute(
+            'DELETE FROM {table} WHERE {owner} IS NULL OR genre_id IS NULL'.format(table=table, owner=owner)
+        )
+        if is_postgresql:
+            op.execute(
+                'DELETE FROM {table} a USING {table} b '
+                'WHERE a.ctid < b.ctid AND a.{owner} = b.{owner} AND a.genre_id = b.genre_id'.format(table=table, owner=owner)
+            )
+        if is_postgresql:
+            # SET NOT NULL scans the table under an ACCESS EXCLUSIVE lock. A
+            # NOT VALID check is added without a scan and validated below
+            # under a lock that lets writes through.
+            for column in (owner, 'genre_id'):
+                op.execute(
+                    'ALTER TABLE {table} ADD CONSTRAINT ck_{table}_{column}_not_null '
+                    'CHECK ({column} IS NOT NULL) NOT VALID'.format(table=table, column=column)
+                )
+        else:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.alter_column(owner, existing_type=sa.Integer(), nullable=False)
+                batch_op.alter_column('genre_id', existing_type=sa.Integer(), nullable=False)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so the
+    # indexes are built in autocommit mode and never hold a write lock. Each
+    # VALIDATE CONSTRAINT commits on its own too, so the ACCESS EXCLUSIVE
+    # lock taken when the check was added is not held through its scan.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        if is_postgresql:
+            for table, owner in ASSOCIATIONS:
+                for column in (owner, 'genre_id'):
+                    op.execute('ALTER TABLE {table} VALIDATE CONSTRAINT ck_{table}_{column}_not_null'.format(
+                        table=table, column=column))
+                op.create_index(table + '_pkey', table, [owner, 'genre_id'], unique=True, postgresql_concurrently=True)
+
+    for table, owner in ASSOCIATIONS:
+        if is_postgresql:
+            # PostgreSQL 12+ proves NOT NULL from the validated check and
+            # skips the scan; older servers still scan here, under lock
+            for column in (owner, 'genre_id'):
+                op.execute('ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL'.format(table=table, column=column))
+                op.execute('ALTER TABLE {table} DROP CONSTRAINT ck_{table}_{column}_not_null'.format(table=table, column=column))
+            # Promote the concurrently built unique index instead of rebuilding it under lock
+            op.execute(
+                'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {table}_pkey'.format(table=table)
+            )
+        else:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.create_primary_key(table + '_pkey', [owner, 'genre_id'])
+
+
+def downgrade():
+    for table, owner in ASSOCIATIONS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(table + '_pkey', type_='primary')
+            batch_op.alter_column('genre_id', existing_type=sa.Integer(), nullable=True)
+            batch_op.alter_column(owner, existing_type=sa.Integer(), nullable=True)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""add venue latitude, longitude and geocell
+
+Revision ID: c4e82f1b7d93
+Revises: a6c39e5d0f18
+Create Date: 2026-10-18 21:42:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e82f1b7d93'
+down_revision = 'a6c39e5d0f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing venues are located by `flask gazetteer locate-venues`
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geocell', sa.Integer(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_Venue_geocell', 'Venue', ['geocell'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_Venue_geocell', table_name='Venue', postgresql_concurrently=True)
+
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.drop_column('geocell')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -0,0 +1,106 @@
+"""add full-text and trigram search documents for Venue and Artist
+
+Revision ID: f0a806675ec5
+Revises: 22b0945182f9
+Create Date: 2026-10-18 11:20:54.106372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'f0a806675ec5'
+down_revision = '22b0945182f9'
+branch_labels = None
+depends_on = None
+
+
+# (table, genre association table, owner column in the association table)
+ENTITIES = [
+    ('Venue', 'venue_genres', 'venue_id'),
+    ('Artist', 'artist_genres', 'artist_id'),
+]
+
+# search_vector weights the name above city/state above genre names
+SEARCH_DOCUMENT = '''
+CREATE OR REPLACE FUNCTION "{table}_search_document"(entity_id integer) RETURNS tsvector AS $$
+  SELECT setweight(to_tsvector('simple', coalesce(e.name, '')), 'A')
+      || setweight(to_tsvector('simple', coalesce(e.city, '') || ' ' || coalesce(e.state, '')), 'B')
+      || setweight(to_tsvector('simple', coalesce(string_agg(g.name, ' '), '')), 'C')
+  FROM "{table}" e
+  LEFT JOIN {assoc} a ON a.{owner} = e.id
+  LEFT JOIN "Genre" g ON g.id = a.genre_id
+  WHERE e.id = entity_id
+  GROUP BY e.id
+$$ LANGUAGE sql STABLE
+'''
+
+# Keeps search_vector current whenever the entity or its genre links change
+SEARCH_REFRESH = '''
+CREATE OR REPLACE FUNCTION "{table}_search_refresh"() RETURNS trigger AS $$
+BEGIN
+  IF TG_TABLE_NAME = '{table}' THEN
+    UPDATE "{table}" SET search_vector = "{table}_search_document"(NEW.id) WHERE id = NEW.id;
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE "{table}" SET search_vector = "{table}_search_document"(OLD.{owner}) WHERE id = OLD.{owner};
+  ELSE
+    UPDATE "{table}" SET search_vector = "{table}_search_document"(NEW.{owner}) WHERE id = NEW.{owner};
+  END IF;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+'''
+
+
+def upgrade():
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    for table, assoc, owner in ENTITIES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('search_vector', sa.Text().with_variant(postgresql.TSVECTOR(), 'postgresql'), nullable=True))
+
+    if not is_postgresql:
+        # Other databases use the LIKE fallback in search.py and never read search_vector
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, assoc, owner in ENTITIES:
+        op.execute(SEARCH_DOCUMENT.format(table=table, assoc=assoc, owner=owner))
+        op.execute(SEARCH_REFRESH.format(table=table, owner=owner))
+        op.execute(
+            'CREATE TRIGGER "{table}_search_refresh" AFTER INSERT OR UPDATE OF name, city, state ON "{table}" '
+            'FOR EACH ROW EXECUTE PROCEDURE "{table}_search_refresh"()'.format(table=table)
+        )
+        op.execute(
+            'CREATE TRIGGER "{assoc}_search_refresh" AFTER INSERT OR DELETE ON {assoc} '
+            'FOR EACH ROW EXECUTE PROCEDURE "{table}_search_refresh"()'.format(table=table, assoc=assoc)
+        )
+        op.execute('UPDATE "{table}" SET search_vector = "{table}_search_document"(id)'.format(table=table))
+
+    with op.get_context().autocommit_block():
+        for table, assoc, owner in ENTITIES:
+            op.create_index('ix_{}_search_vector'.format(table), table, ['search_vector'], unique=False,
+                            postgresql_using='gin', postgresql_concurrently=True)
+            op.create_index('ix_{}_name_trgm'.format(table), table, ['name'], unique=False,
+                            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade():
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    if is_postgresql:
+        with op.get_context().autocommit_block():
+            for table, assoc, owner in ENTITIES:
+                op.drop_index('ix_{}_name_trgm'.format(table), table_name=table, postgresql_concurrently=True)
+                op.drop_index('ix_{}_search_vector'.format(table), table_name=table, postgresql_concurrently=True)
+
+        for table, assoc, owner in ENTITIES:
+            op.execute('DROP TRIGGER IF EXISTS "{assoc}_search_refresh" ON {assoc}'.format(assoc=assoc))
+            op.execute('DROP TRIGGER IF EXISTS "{table}_search_refresh" ON "{table}"'.format(table=table))
+            op.execute('DROP FUNCTION IF EXISTS "{table}_search_refresh"()'.format(table=table))
+            op.execute('DROP FUNCTION IF EXISTS "{table}_search_document"(integer)'.format(table=table))
+
+    for table, assoc, owner in ENTITIES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('search_vector')
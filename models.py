@@ -1,19 +1,52 @@
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import ForeignKey
-from datetime import datetime
-db = SQLAlchemy()
+from sqlalchemy import ForeignKey, and_, bindparam, case, func, or_, select
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from datetime import datetime, timedelta
+from itertools import groupby
+from pooling import PooledSQLAlchemy
+db = PooledSQLAlchemy()
 
 
 
 # Define the association table for the many-to-many relationship
 venue_genres = db.Table('venue_genres',
-    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id')),
-    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'))
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True)
 )
 # Define the association table for the many-to-many relationship
 artist_genres = db.Table('artist_genres',
-    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id')),
-    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'))
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True)
+)
+
+# Per-venue and per-artist show counts, maintained by show_counts.py. upcoming
+# is exact while next_start (the earliest upcoming start_time, or earlier)
+# lies in the future; past is total - upcoming.
+venue_show_counts = db.Table('venue_show_counts',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('total', db.Integer, nullable=False, default=0),
+    db.Column('upcoming', db.Integer, nullable=False, default=0),
+    db.Column('next_start', db.DateTime),
+)
+artist_show_counts = db.Table('artist_show_counts',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('total', db.Integer, nullable=False, default=0),
+    db.Column('upcoming', db.Integer, nullable=False, default=0),
+    db.Column('next_start', db.DateTime),
+)
+
+# One row per table, bumped by every write to it (see freshness.touch); the
+# listing pages' validators read these instead of aggregating the tables
+table_versions = db.Table('table_versions',
+    db.Column('name', db.String(64), primary_key=True),
+    db.Column('version', db.Integer, nullable=False, default=0),
+    db.Column('changed_at', db.DateTime, nullable=False),
+)
+
+# Server-side session data when SESSION_STORE_URI is set (see session_store.py)
+sessions_table = db.Table('flask_sessions',
+    db.Column('id', db.String(64), primary_key=True),
+    db.Column('data', db.Text, nullable=False),
+    db.Column('expires_at', db.DateTime, nullable=False, index=True),
 )
 
 
@@ -26,11 +59,19 @@ class Genre(db.Model):
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        # /venues groups and pages by area
+        db.Index('ix_Venue_state_city_id', 'state', 'city', 'id'),
+        # search.py
+        db.Index('ix_Venue_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    # Keyset pagination keys, never NULL (see pagination.py)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(1000))
@@ -41,32 +82,91 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500))
 
+    # located from city and state by geo.py; geocell is the venue's cell of
+    # the grid that /venues/near searches through ix_Venue_geocell
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geocell = db.Column(db.Integer, index=True)
+
+    # name, city, state and genres, maintained by database triggers (PostgreSQL only)
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))
+
+    # bumped on every ORM write; feeds the conditional GET validators in freshness.py
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now, server_default=func.now(), index=True)
+
     #(DONE) TODO: implement any missing fields, as a database migration using Flask-Migrate
-    shows = db.relationship('Show', backref='venue', lazy=True)
+    # a venue's shows go with it; show pages and artist pages need their venue
+    shows = db.relationship('Show', backref='venue', lazy=True, cascade='all, delete-orphan')
     genres = db.relationship('Genre', secondary=venue_genres, backref=db.backref('venues', lazy=True))
     
-    @property
-    def upcoming_shows_count(self):
-        return len([show for show in self.shows if show.start_time > datetime.now()])
+    @classmethod
+    def area_query(cls):
+        # One query returns each venue with its upcoming show count from the rollup
+        return db.session.query(
+            cls.id, cls.name, cls.city, cls.state,
+            cls.upcoming_shows_count.label('num_upcoming_shows'),
+        )
+
+    @staticmethod
+    def group_by_area(rows):
+        # Folds area_query() rows, ordered by state and city, into the city/state areas of /venues
+        return [{
+            "city": city,
+            "state": state,
+            "venues": [{
+                "id": row.id,
+                "name": row.name,
+                "num_upcoming_shows": row.num_upcoming_shows,
+            } for row in venues],
+        } for (state, city), venues in groupby(rows, key=lambda row: (row.state, row.city))]
+
+# Length of a show booked without an end time
+DEFAULT_SHOW_LENGTH = timedelta(hours=3)
+
+
+def _default_end_time(context):
+  return context.get_current_parameters()['start_time'] + DEFAULT_SHOW_LENGTH
 
-    @property
-    def past_shows_count(self):
-        return len([show for show in self.shows if show.start_time < datetime.now()])
 class Show(db.Model):
   __tablename__ = 'Show'
+  __table_args__ = (
+    # detail pages split a venue's or artist's shows on start_time
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    # /shows pages on (start_time, id)
+    db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    # one booking per venue, artist and start time; lets imports skip duplicates
+    db.Index('uq_Show_venue_id_artist_id_start_time', 'venue_id', 'artist_id', 'start_time', unique=True),
+    db.CheckConstraint('end_time > start_time', name='ck_Show_end_time'),
+    # No two shows overlap at a venue or for an artist: exclusion constraints on
+    # PostgreSQL (see the migration), bookings.py elsewhere
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   venue_id = db.Column(db.Integer, ForeignKey('Venue.id'))
   artist_id = db.Column(db.Integer, ForeignKey('Artist.id'))
   start_time = db.Column(db.DateTime, nullable=False)
-  image_link = db.Column(db.String(500))
-  artist_name = db.Column(db.String(120))
+  end_time = db.Column(db.DateTime, nullable=False, default=_default_end_time)
+  # copies of the artist's and venue's fields for /shows, kept by show_listing.py
+  image_link = db.Column(db.String(1000))
+  artist_name = db.Column(db.String)
+  venue_name = db.Column(db.String)
+  # bumped on every ORM write; feeds the conditional GET validators in freshness.py
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now, server_default=func.now(), index=True)
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        # /artists pages on (name, id)
+        db.Index('ix_Artist_name_id', 'name', 'id'),
+        # search.py
+        db.Index('ix_Artist_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    # Keyset pagination key, never NULL (see pagination.py)
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
@@ -76,19 +176,44 @@ class Artist(db.Model):
     seeking_description = db.Column(db.String(500))
     website_link = db.Column(db.String(1000))
 
+    # name, city, state and genres, maintained by database triggers (PostgreSQL only)
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))
+
+    # bumped on every ORM write; feeds the conditional GET validators in freshness.py
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now, server_default=func.now(), index=True)
+
     # Relationship with Genre model
     genres = db.relationship('Genre', secondary=artist_genres, backref=db.backref('artists', lazy=True))
 
     # Relationship with Show model
     shows = db.relationship('Show', backref='artist', lazy=True)
-
-    @property
-    def upcoming_shows_count(self):
-        return len([show for show in self.shows if show.start_time > datetime.now()])
-
-    @property
-    def past_shows_count(self):
-        return len([show for show in self.shows if show.start_time < datetime.now()])
     #(done) TODO: implement any missing fields, as a database migration using Flask-Migrate
 
     #(done) TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+
+# Show counts are correlated SQL aggregates instead of Python loops over every
+# booked show. They are deferred: a single instance loads its count on first
+# access, and listings batch-load them for every row with
+# .options(undefer_group('show_counts')).
+def _show_counts(owner_id, show_owner_id, rollup):
+    # Counts come from the rollup row. A row whose next_start has passed is
+    # recounted from Show until the next refresh, as is a missing row.
+    now = bindparam('now', callable_=datetime.now, type_=db.DateTime, unique=True)
+    rollup_owner_id = rollup.primary_key.columns.values()[0]
+
+    def live(when):
+        return select([func.count(Show.id)]).where(and_(show_owner_id == owner_id, when)).correlate_except(Show).as_scalar()
+
+    upcoming = case([(or_(rollup.c.next_start == None, rollup.c.next_start > now), rollup.c.upcoming)],
+                    else_=live(Show.start_time > now))
+
+    def rolled_up(expression, fallback):
+        rolled = select([expression]).where(rollup_owner_id == owner_id).correlate_except(rollup).as_scalar()
+        return db.column_property(func.coalesce(rolled, fallback), deferred=True, group='show_counts')
+
+    return (rolled_up(upcoming, live(Show.start_time > now)),
+            rolled_up(rollup.c.total - upcoming, live(Show.start_time <= now)))
+
+Venue.upcoming_shows_count, Venue.past_shows_count = _show_counts(Venue.id, Show.venue_id, venue_show_counts)
+Artist.upcoming_shows_count, Artist.past_shows_count = _show_counts(Artist.id, Show.artist_id, artist_show_counts)
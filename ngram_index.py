@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import defaultdict
+
+
+# In-process trigram inverted index over Venue and Artist names, used by
+# search.py when SEARCH_BACKEND = 'ngram'. A term of at least N characters is
+# looked up by intersecting the posting sets of its trigrams and confirming
+# the substring, so results match the database's case-insensitive
+# substring search. Shorter terms fall back to a scan of the cached names.
+#
+# Each process holds its own copy. The create/delete handlers update it
+# incrementally, and it is rebuilt from the database once it is older than
+# SEARCH_INDEX_MAX_AGE, which bounds how long writes made through other
+# workers stay invisible.
+
+N = 3
+
+
+def _grams(text):
+    return {text[i:i + N] for i in range(len(text) - N + 1)}
+
+
+class NgramIndex(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = {}
+        self._postings = defaultdict(set)
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def build(self, rows):
+        # rows are (id, name) pairs; the new index is swapped in atomically
+        names = {}
+        postings = defaultdict(set)
+        for entity_id, name in rows:
+            name = (name or '').lower()
+            names[entity_id] = name
+            for gram in _grams(name):
+                postings[gram].add(entity_id)
+        with self._lock:
+            self._names = names
+            self._postings = postings
+            self.built_at = time.monotonic()
+
+    def add(self, entity_id, name):
+        name = (name or '').lower()
+        with self._lock:
+            self._remove(entity_id)
+            self._names[entity_id] = name
+            for gram in _grams(name):
+                self._postings[gram].add(entity_id)
+
+    def remove(self, entity_id):
+        with self._lock:
+            self._remove(entity_id)
+
+    def _remove(self, entity_id):
+        name = self._names.pop(entity_id, None)
+        if name is None:
+            return
+        for gram in _grams(name):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(entity_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def is_stale(self, max_age):
+        return self.built_at is None or time.monotonic() - self.built_at > max_age
+
+    def search(self, term):
+        # Returns matching ids: exact name first, then prefix, then earliest match
+        term = term.strip().lower()
+        with self._lock:
+            if len(term) < N:
+                matches = [(entity_id, name) for entity_id, name in self._names.items() if term in name]
+            else:
+                postings = sorted((self._postings.get(gram, ()) for gram in _grams(term)), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+                matches = [(entity_id, self._names[entity_id]) for entity_id in candidates]
+        matches = [(entity_id, name) for entity_id, name in matches if term in name]
+        matches.sort(key=lambda match: (match[1] != term, not match[1].startswith(term), match[1].find(term), match[1], match[0]))
+        return [entity_id for entity_id, name in matches]
+
+
+venue_index = NgramIndex()
+artist_index = NgramIndex()
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+# LRU cache of rendered venue and artist pages. A page only changes when one
+# of its shows is created or deleted, which the write handlers invalidate, or
+# when its next upcoming show starts and moves into the past, so each entry
+# expires at that start_time. The ttl caps every entry's lifetime because
+# writes handled by other worker processes cannot invalidate this one.
+
+class PageCache(object):
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = timedelta(seconds=ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and datetime.now() >= entry[0]:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, page, expires_at=None):
+        expires_at = min(filter(None, (expires_at, datetime.now() + self.ttl)))
+        with self._lock:
+            self._entries[key] = (expires_at, page)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *prefixes):
+        # Drops every entry whose key starts with one of the given tuples
+        with self._lock:
+            stale = [key for key in self._entries
+                     if any(key[:len(prefix)] == prefix for prefix in prefixes)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import DateTime, literal, tuple_
+
+
+# Keyset (cursor) pagination: each page is fetched with
+# "WHERE (key1, key2) > (:last1, :last2) ORDER BY key1, key2 LIMIT n", so a deep
+# page walks the same index range as page one instead of skipping OFFSET rows.
+# The key columns must end in a unique column (the primary key) to be a total order,
+# and must be NOT NULL: a row comparison with a NULL in it is never true, so a
+# page ending on a NULL key would have no next page.
+
+class Page(object):
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    # Raises ValueError for anything that is not a cursor we issued for these keys
+    try:
+        raw = base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode('ascii'))
+        values = json.loads(raw.decode('utf-8'))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError('wrong number of cursor values')
+        return [datetime.fromisoformat(value) if isinstance(key.type, DateTime) else value
+                for key, value in zip(keys, values)]
+    except (TypeError, ValueError) as e:
+        raise ValueError('malformed cursor') from e
+
+
+def _cursor_for(row, keys):
+    return encode_cursor([getattr(row, key.key) for key in keys])
+
+
+def keyset_paginate(query, keys, after=None, before=None, per_page=20):
+    keys = list(keys)
+    position = tuple_(*keys)
+
+    if before is not None:
+        # Walk backwards from the cursor and flip the rows back into display order
+        bound = tuple_(*[literal(value, type_=key.type) for key, value in zip(keys, decode_cursor(before, keys))])
+        rows = query.filter(position < bound).order_by(*[key.desc() for key in keys]).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            bound = tuple_(*[literal(value, type_=key.type) for key, value in zip(keys, decode_cursor(after, keys))])
+            query = query.filter(position > bound)
+        rows = query.order_by(*keys).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    if not rows:
+        return Page(rows)
+    return Page(
+        rows,
+        next_cursor=_cursor_for(rows[-1], keys) if has_next else None,
+        prev_cursor=_cursor_for(rows[0], keys) if has_prev else None,
+    )
+
+
+def ranked_paginate(query, after=None, per_page=20):
+    # Ranked results (search) have no key to seek on, so their cursors hold
+    # the offset of the page's first row. Nobody reads deep into a search.
+    offset = 0
+    if after is not None:
+        offset = decode_cursor(after, [literal(0)])[0]
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError('malformed cursor')
+    rows = query.offset(offset).limit(per_page + 1).all()
+    return Page(
+        rows[:per_page],
+        next_cursor=encode_cursor([offset + per_page]) if len(rows) > per_page else None,
+        prev_cursor=encode_cursor([max(offset - per_page, 0)]) if offset else None,
+    )
+
+
+def _request_page_size():
+    per_page = request.args.get('per_page', current_app.config['PAGE_SIZE'], type=int)
+    return max(1, min(per_page, current_app.config['MAX_PAGE_SIZE']))
+
+
+def paginate_request(query, keys):
+    # Reads ?after=, ?before= and ?per_page= from the current request; an
+    # empty cursor is the same as none
+    try:
+        return keyset_paginate(
+            query, keys,
+            after=request.args.get('after') or None,
+            before=request.args.get('before') or None,
+            per_page=_request_page_size(),
+        )
+    except ValueError:
+        abort(400)
+
+
+def paginate_ranked_request(query):
+    # Reads ?after= and ?per_page= from the current request; both cursors of
+    # the page go in ?after=
+    try:
+        return ranked_paginate(query, after=request.args.get('after') or None, per_page=_request_page_size())
+    except ValueError:
+        abort(400)
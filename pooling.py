@@ -0,0 +1,90 @@
+import threading
+import time
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+# Connection pool settings from the DB_POOL_* config values (see config.py).
+# They are applied when Flask-SQLAlchemy creates the engine, so they follow
+# whatever SQLALCHEMY_DATABASE_URI is at that point. SQLite keeps
+# Flask-SQLAlchemy's own pool choice and settings. With DB_PGBOUNCER the app
+# holds no connections of its own (NullPool) and leaves pooling to PgBouncer
+# in transaction mode. The app keeps no session state on a connection
+# between transactions, and psycopg2 does not use server-side prepared
+# statements, so both work through it.
+#
+# TimedQueuePool counts checkouts and the time spent waiting for a free
+# connection; pool_stats() reports them along with the pool's occupancy.
+
+class TimedQueuePool(QueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super(TimedQueuePool, self).__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._waiting = threading.local()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; only the outer call is timed
+        if getattr(self._waiting, 'active', False):
+            return super(TimedQueuePool, self)._do_get()
+        self._waiting.active = True
+        started = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            self._waiting.active = False
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        super(PooledSQLAlchemy, self).apply_driver_hacks(app, sa_url, options)
+        config = app.config
+        if sa_url.drivername.startswith('sqlite'):
+            return
+        if config['DB_PGBOUNCER']:
+            options['poolclass'] = NullPool
+            return
+        options.setdefault('poolclass', TimedQueuePool)
+        options.setdefault('pool_size', config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+        options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+        options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'wait_seconds': round(pool.wait_seconds, 6),
+                'mean_wait_seconds': round(pool.wait_seconds / pool.checkouts, 6) if pool.checkouts else 0.0,
+                'max_wait_seconds': round(pool.max_wait_seconds, 6),
+            })
+    return stats
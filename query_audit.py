@@ -0,0 +1,107 @@
+import functools
+import os
+import sys
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Development/test checks on how many queries a request runs. With
+# QUERY_AUDIT set to 'log' or 'raise', every statement a request executes is
+# counted by its SQL text (parameters are bound separately, so a lazy load
+# repeated in a loop produces the same text each time). Once one text has run
+# N_PLUS_ONE_THRESHOLD times the request is flagged, with the view and
+# template lines that led to it; 'raise' turns that into an error.
+#
+# @query_budget(n) caps the statements a view (including its template) may
+# run, and assert_max_queries(n) does the same around any block in a test.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SKIPPED = (os.path.join(ROOT, 'envh') + os.sep, os.path.abspath(__file__))
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_counters = []
+
+
+def _app_stack():
+    # View and template lines on the current stack, outermost first
+    lines = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        template = frame.f_globals.get('__jinja_template__')
+        filename = frame.f_code.co_filename
+        if template is not None:
+            lines.append('  template {}, line {}'.format(template.name, template.get_corresponding_lineno(frame.f_lineno)))
+        elif filename.startswith(ROOT) and not filename.startswith(SKIPPED):
+            lines.append('  {}, line {}, in {}'.format(os.path.relpath(filename, ROOT), frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    return '\n'.join(reversed(lines))
+
+
+def _report(error, message):
+    if current_app.config['QUERY_AUDIT'] == 'raise':
+        raise error(message)
+    current_app.logger.warning(message)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in _counters:
+        counter.append(statement)
+    if not has_request_context() or 'query_audit' not in g:
+        return
+    statements = g.query_audit
+    statements[statement] += 1
+    if statements[statement] == current_app.config['N_PLUS_ONE_THRESHOLD']:
+        _report(NPlusOneError, 'possible N+1 in {} {}: the same statement ran {} times\n{}\n{}'.format(
+            request.method, request.path, statements[statement], statement, _app_stack()))
+
+
+def _start_request():
+    if current_app.config['QUERY_AUDIT']:
+        g.query_audit = Counter()
+
+
+def query_budget(limit):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if 'query_audit' not in g:
+                return view(*args, **kwargs)
+            before = sum(g.query_audit.values())
+            response = view(*args, **kwargs)
+            used = sum(g.query_audit.values()) - before
+            if used > limit:
+                _report(QueryBudgetExceeded, '{} ran {} queries, its budget is {}'.format(request.endpoint, used, limit))
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def assert_max_queries(limit):
+    statements = []
+    _counters.append(statements)
+    try:
+        yield statements
+    finally:
+        _counters.remove(statements)
+    if len(statements) > limit:
+        raise QueryBudgetExceeded('{} queries ran, at most {} expected:\n{}'.format(
+            len(statements), limit, '\n'.join(statements)))
+
+
+def init_app(app):
+    app.before_request(_start_request)
@@ -0,0 +1,105 @@
+import threading
+
+from flask import current_app
+from sqlalchemy import case, false, func, or_
+
+from models import db, Artist, Genre, Venue
+from ngram_index import artist_index, venue_index
+
+
+# Venue and Artist search. On PostgreSQL rows match on the trigger-maintained
+# search_vector (name, city, state and genres) or on a substring of the name,
+# served by the GIN tsvector and gin_trgm_ops indexes respectively, and are
+# ordered by ts_rank plus trigram similarity of the name. Other databases
+# (SQLite in tests and benchmarks) get a LIKE scan over the same fields with a
+# simple name-based ranking. With SEARCH_BACKEND = 'ngram' names are matched
+# in process by ngram_index.py and the database only hydrates the ids. A
+# stale index goes on serving while one background thread rebuilds it.
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _postgresql_search(model, term):
+    tsquery = func.plainto_tsquery('simple', term)
+    pattern = '%' + _escape_like(term) + '%'
+    rank = func.ts_rank(model.search_vector, tsquery) + func.similarity(model.name, term)
+    return model.query.filter(or_(
+        model.search_vector.op('@@')(tsquery),
+        model.name.ilike(pattern, escape='\\'),
+    )).order_by(rank.desc(), model.id)
+
+
+def _fallback_search(model, term):
+    escaped = _escape_like(term)
+    pattern = '%' + escaped + '%'
+    rank = case([
+        (func.lower(model.name) == term.lower(), 3),
+        (model.name.ilike(escaped + '%', escape='\\'), 2),
+        (model.name.ilike(pattern, escape='\\'), 1),
+    ], else_=0)
+    return model.query.filter(or_(
+        model.name.ilike(pattern, escape='\\'),
+        model.city.ilike(pattern, escape='\\'),
+        model.state.ilike(pattern, escape='\\'),
+        model.genres.any(Genre.name.ilike(pattern, escape='\\')),
+    )).order_by(rank.desc(), model.name, model.id)
+
+
+_rebuilding = {Venue: threading.Lock(), Artist: threading.Lock()}
+
+
+def _index_for(model):
+    return venue_index if model is Venue else artist_index
+
+
+def _rebuild(app, model):
+    try:
+        with app.app_context():
+            _index_for(model).build(db.session.query(model.id, model.name).all())
+    except Exception:
+        app.logger.exception('%s search index rebuild failed', model.__name__)
+    finally:
+        _rebuilding[model].release()
+
+
+def _ngram_index(model):
+    index = _index_for(model)
+    if index.built_at is None:
+        # Nothing to serve yet, so the first search builds it and others wait
+        with _rebuilding[model]:
+            if index.built_at is None:
+                index.build(db.session.query(model.id, model.name))
+    elif index.is_stale(current_app.config['SEARCH_INDEX_MAX_AGE']) and _rebuilding[model].acquire(blocking=False):
+        threading.Thread(target=_rebuild, args=(current_app._get_current_object(), model),
+                         name='search-index', daemon=True).start()
+    return index
+
+
+def _ngram_search(model, term):
+    ids = _ngram_index(model).search(term)
+    if not ids:
+        return model.query.filter(false())
+    position = case({entity_id: i for i, entity_id in enumerate(ids)}, value=model.id)
+    return model.query.filter(model.id.in_(ids)).order_by(position)
+
+
+def index_entity(entity):
+    # Called by the write handlers after commit to keep the n-gram index current
+    _index_for(type(entity)).add(entity.id, entity.name)
+
+
+def unindex_entity(model, entity_id):
+    _index_for(model).remove(entity_id)
+
+
+def search(model, term):
+    # Returns a query of Venue or Artist rows matching term, best match first
+    term = term.strip()
+    if current_app.config['SEARCH_BACKEND'] == 'ngram':
+        return _ngram_search(model, term)
+    if not term:
+        return model.query.order_by(model.name, model.id)
+    if db.engine.dialect.name == 'postgresql':
+        return _postgresql_search(model, term)
+    return _fallback_search(model, term)
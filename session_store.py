@@ -0,0 +1,132 @@
+import random
+import secrets
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from sqlalchemy import and_, create_engine, select
+
+from models import sessions_table
+
+
+# Optional server-side sessions. With SESSION_STORE_URI set (a SQLAlchemy
+# URL, e.g. sqlite:////var/lib/fyyur/sessions.db for one node or the main
+# PostgreSQL database for several), the session cookie only carries a signed
+# random id and the data lives in the flask_sessions table, so every worker
+# and node sees the same flashes. A row is written only when the session
+# changes; visitors without a session never get one. Rows expire after
+# SESSION_STORE_TTL seconds (permanent sessions after
+# PERMANENT_SESSION_LIFETIME). About one write in a hundred also deletes
+# expired rows, and `flask sessions purge` does that on demand.
+#
+# The table is part of the models and created by the migrations; a store
+# outside the main database gets it once with `flask sessions create-table`.
+
+sessions_cli = AppGroup('sessions', help='Manage the server-side session store.')
+
+PURGE_PROBABILITY = 0.01
+
+
+class ServerSideSession(SecureCookieSession):
+
+    def __init__(self, initial=None, sid=None):
+        super(ServerSideSession, self).__init__(initial)
+        self.sid = sid
+
+
+class ServerSideSessionInterface(SecureCookieSessionInterface):
+    salt = 'server-side-session'
+    session_class = ServerSideSession
+
+    def __init__(self, uri, ttl):
+        self.engine = create_engine(uri, pool_pre_ping=True)
+        self.ttl = timedelta(seconds=ttl)
+
+    def open_session(self, app, request):
+        signer = self.get_signing_serializer(app)
+        if signer is None:
+            return None
+        value = request.cookies.get(app.session_cookie_name)
+        if not value:
+            return self.session_class()
+        try:
+            sid = signer.loads(value)
+        except BadSignature:
+            return self.session_class()
+        with self.engine.connect() as connection:
+            data = connection.execute(select([sessions_table.c.data]).where(and_(
+                sessions_table.c.id == sid, sessions_table.c.expires_at > datetime.utcnow()))).scalar()
+        if data is None:
+            return self.session_class()
+        return self.session_class(self.serializer.loads(data), sid=sid)
+
+    def save_session(self, app, session, response):
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                if session.sid:
+                    with self.engine.begin() as connection:
+                        connection.execute(sessions_table.delete().where(sessions_table.c.id == session.sid))
+                response.delete_cookie(app.session_cookie_name, domain=domain, path=path)
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session.modified:
+            return
+
+        sid = session.sid or secrets.token_urlsafe(32)
+        expires = self.get_expiration_time(app, session)
+        values = {'data': self.serializer.dumps(dict(session)), 'expires_at': expires or datetime.utcnow() + self.ttl}
+        with self.engine.begin() as connection:
+            updated = connection.execute(sessions_table.update().where(sessions_table.c.id == sid).values(**values)).rowcount
+            if not updated:
+                connection.execute(sessions_table.insert().values(id=sid, **values))
+        if random.random() < PURGE_PROBABILITY:
+            self.purge()
+
+        response.set_cookie(
+            app.session_cookie_name,
+            self.get_signing_serializer(app).dumps(sid),
+            expires=expires,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def purge(self):
+        with self.engine.begin() as connection:
+            return connection.execute(sessions_table.delete().where(sessions_table.c.expires_at <= datetime.utcnow())).rowcount
+
+
+def _store():
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSideSessionInterface):
+        raise click.UsageError('SESSION_STORE_URI is not set, sessions live in cookies')
+    return interface
+
+
+@sessions_cli.command('create-table', help='Create the sessions table in a store outside the main database.')
+@with_appcontext
+def create_table():
+    sessions_table.create(_store().engine, checkfirst=True)
+    click.echo('flask_sessions is ready')
+
+
+@sessions_cli.command('purge', help='Delete expired sessions.')
+@with_appcontext
+def purge():
+    click.echo('{} expired sessions deleted'.format(_store().purge()))
+
+
+def init_app(app):
+    app.cli.add_command(sessions_cli)
+    if app.config['SESSION_STORE_URI']:
+        app.session_interface = ServerSideSessionInterface(app.config['SESSION_STORE_URI'], app.config['SESSION_STORE_TTL'])
@@ -0,0 +1,140 @@
+import time
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import db, Artist, Show, Venue, artist_show_counts, venue_show_counts
+
+
+# Maintains venue_show_counts and artist_show_counts (see models.py), which
+# the listing, search and area views read instead of counting Show rows.
+# Show inserts, deletes and moves made through the ORM adjust the affected
+# rows in the same transaction. refresh() recounts rows from Show. On
+# PostgreSQL it holds a SHARE ROW EXCLUSIVE lock, so readers carry on while
+# concurrent adjustments wait for it, and then upserts all rows in one
+# statement. Run `flask show-counts refresh` from cron, or with --every, so
+# rows whose next show has started stop falling back to live counts.
+
+show_counts_cli = AppGroup('show-counts', help='Maintain the per-venue and per-artist show count rollups.')
+
+ROLLUPS = (
+    (venue_show_counts, venue_show_counts.c.venue_id, Venue, Show.venue_id),
+    (artist_show_counts, artist_show_counts.c.artist_id, Artist, Show.artist_id),
+)
+
+
+def _counts_select(owner, show_owner_id, now, owner_ids):
+    upcoming = Show.start_time > now
+    query = select([
+        owner.id,
+        func.count(Show.id),
+        func.sum(case([(upcoming, 1)], else_=0)),
+        func.min(case([(upcoming, Show.start_time)])),
+    ]).select_from(owner.__table__.outerjoin(Show, show_owner_id == owner.id)).group_by(owner.id)
+    if owner_ids is not None:
+        query = query.where(owner.id.in_(owner_ids))
+    return query
+
+
+def refresh(venue_ids=None, artist_ids=None):
+    """Recounts the rollup rows of the given owners, or of every owner, in the
+    session's transaction."""
+    now = datetime.now()
+    connection = db.session.connection()
+    postgresql = connection.dialect.name == 'postgresql'
+    for (table, owner_column, owner, show_owner_id), owner_ids in zip(ROLLUPS, (venue_ids, artist_ids)):
+        if owner_ids is not None and not owner_ids:
+            continue
+        counts = _counts_select(owner, show_owner_id, now, owner_ids)
+        columns = [owner_column, table.c.total, table.c.upcoming, table.c.next_start]
+        if postgresql:
+            connection.execute('LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE'.format(table.name))
+            statement = pg_insert(table).from_select(columns, counts)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[owner_column],
+                set_={column.name: statement.excluded[column.name] for column in columns[1:]},
+            ))
+        else:
+            stale = table.delete()
+            if owner_ids is not None:
+                stale = stale.where(owner_column.in_(owner_ids))
+            connection.execute(stale)
+            connection.execute(table.insert().from_select(columns, counts))
+
+
+def _adjust(connection, table, owner_column, owner_id, start_time, delta):
+    if owner_id is None:
+        return
+    upcoming = 1 if start_time > datetime.now() else 0
+    # next_start only ever moves earlier here; refresh() moves it forward
+    next_start = case([(table.c.next_start == None, start_time), (table.c.next_start > start_time, start_time)],
+                      else_=table.c.next_start) if upcoming and delta > 0 else table.c.next_start
+    updated = connection.execute(table.update().where(owner_column == owner_id).values(
+        total=table.c.total + delta,
+        upcoming=table.c.upcoming + upcoming * delta,
+        next_start=next_start,
+    )).rowcount
+    if not updated and delta > 0:
+        # First show of this owner since the last refresh
+        values = {owner_column.name: owner_id, 'total': 1, 'upcoming': upcoming,
+                  'next_start': start_time if upcoming else None}
+        if connection.dialect.name == 'postgresql':
+            insert = pg_insert(table).values(values).on_conflict_do_update(
+                index_elements=[owner_column],
+                set_={'total': table.c.total + 1, 'upcoming': table.c.upcoming + upcoming, 'next_start': next_start},
+            )
+        else:
+            insert = table.insert().values(values)
+        connection.execute(insert)
+
+
+def _adjust_show(connection, venue_id, artist_id, start_time, delta):
+    _adjust(connection, venue_show_counts, venue_show_counts.c.venue_id, venue_id, start_time, delta)
+    _adjust(connection, artist_show_counts, artist_show_counts.c.artist_id, artist_id, start_time, delta)
+
+
+@event.listens_for(Show, 'after_insert')
+def _show_inserted(mapper, connection, target):
+    _adjust_show(connection, target.venue_id, target.artist_id, target.start_time, 1)
+
+
+@event.listens_for(Show, 'after_delete')
+def _show_deleted(mapper, connection, target):
+    _adjust_show(connection, target.venue_id, target.artist_id, target.start_time, -1)
+
+
+@event.listens_for(Show, 'after_update')
+def _show_updated(mapper, connection, target):
+    state = inspect(target)
+    old = []
+    for name in ('venue_id', 'artist_id', 'start_time'):
+        history = state.attrs[name].history
+        old.append(history.deleted[0] if history.deleted else getattr(target, name))
+    new = [target.venue_id, target.artist_id, target.start_time]
+    if old != new:
+        _adjust_show(connection, old[0], old[1], old[2], -1)
+        _adjust_show(connection, new[0], new[1], new[2], 1)
+
+
+@event.listens_for(Venue, 'after_delete')
+@event.listens_for(Artist, 'after_delete')
+def _owner_deleted(mapper, connection, target):
+    for table, owner_column, owner, show_owner_id in ROLLUPS:
+        if isinstance(target, owner):
+            connection.execute(table.delete().where(owner_column == target.id))
+
+
+@show_counts_cli.command('refresh', help='Recount every venue and artist show count rollup.')
+@click.option('--every', type=int, default=None, help='Keep running, refreshing every this many seconds.')
+def refresh_command(every):
+    while True:
+        started = time.monotonic()
+        refresh()
+        db.session.commit()
+        click.echo('show counts refreshed in {:.2f}s'.format(time.monotonic() - started))
+        if not every:
+            break
+        time.sleep(max(0, every - (time.monotonic() - started)))
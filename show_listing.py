@@ -0,0 +1,85 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, select
+
+from freshness import touch_on_commit
+from models import db, Artist, Show, Venue
+
+
+# Show carries copies of its artist's name and image_link and its venue's
+# name so /shows reads one table. The copies are filled in when a show is
+# inserted or moved to another venue or artist, and rewritten on every show
+# of an artist or venue when that one is renamed, all in the same flush.
+# Rows written outside the ORM (or before these columns were kept) are
+# filled by `flask shows backfill`.
+
+shows_cli = AppGroup('shows', help='Maintain the venue and artist copies on Show rows.')
+
+ARTIST_COPIES = {'artist_name': Artist.name, 'image_link': Artist.image_link}
+VENUE_COPIES = {'venue_name': Venue.name}
+
+
+def copies_by_id(model, copies, ids):
+    """Maps each existing id of `model` among `ids` to its values of `copies`."""
+    columns = [model.id] + list(copies.values())
+    return {row[0]: dict(zip(copies, row[1:])) for row in db.session.query(*columns).filter(model.id.in_(set(ids)))}
+
+
+def _copies_of(connection, model, copies, entity_id):
+    row = connection.execute(select(list(copies.values())).where(model.id == entity_id)).first()
+    return dict(zip(copies, row or (None,) * len(copies)))
+
+
+def fill(condition=None):
+    """Recopies the names onto the Show rows matching `condition`, or onto every
+    row, in the session's transaction."""
+    # Correlated subqueries work the same on PostgreSQL and SQLite
+    values = {name: select([column]).where(Artist.id == Show.artist_id).as_scalar() for name, column in ARTIST_COPIES.items()}
+    values.update({name: select([column]).where(Venue.id == Show.venue_id).as_scalar() for name, column in VENUE_COPIES.items()})
+    statement = Show.__table__.update().values(**values)
+    if condition is not None:
+        statement = statement.where(condition)
+    touch_on_commit(db.session, Show)
+    return db.session.execute(statement).rowcount
+
+
+def _changed(target, *names):
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+@event.listens_for(Show, 'before_insert')
+@event.listens_for(Show, 'before_update')
+def _copy_into_show(mapper, connection, target):
+    if inspect(target).has_identity and not _changed(target, 'artist_id', 'venue_id'):
+        return
+    copies = _copies_of(connection, Artist, ARTIST_COPIES, target.artist_id)
+    copies.update(_copies_of(connection, Venue, VENUE_COPIES, target.venue_id))
+    for name, value in copies.items():
+        setattr(target, name, value)
+
+
+@event.listens_for(Artist, 'after_update')
+def _artist_changed(mapper, connection, target):
+    if _changed(target, 'name', 'image_link'):
+        connection.execute(Show.__table__.update().where(Show.artist_id == target.id).values(
+            artist_name=target.name, image_link=target.image_link, updated_at=func.now()))
+
+
+@event.listens_for(Venue, 'after_update')
+def _venue_changed(mapper, connection, target):
+    if _changed(target, 'name'):
+        connection.execute(Show.__table__.update().where(Show.venue_id == target.id).values(
+            venue_name=target.name, updated_at=func.now()))
+
+
+@shows_cli.command('backfill', help='Copy artist and venue names onto every Show row.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per UPDATE and transaction.')
+def backfill(batch_size):
+    last_id = db.session.query(func.max(Show.id)).scalar() or 0
+    updated = 0
+    for start in range(0, last_id, batch_size):
+        updated += fill(Show.id.between(start + 1, start + batch_size))
+        db.session.commit()
+        click.echo('{} of {} show ids backfilled'.format(min(start + batch_size, last_id), last_id))
+    click.echo('{} shows updated'.format(updated))
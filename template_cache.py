@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+
+# Compiled templates on local disk. Jinja compiles a template to Python
+# source and then to a code object the first time each process renders it,
+# which on a fresh worker costs more than the render itself. With
+# TEMPLATE_CACHE_DIR set, the code objects are marshalled into that
+# directory and every later worker loads them instead of compiling. An
+# entry is keyed by template name and path and holds a checksum of the
+# source, so an edited template is recompiled and rewritten on first use.
+#
+# `flask templates compile` fills the cache for every template at deploy
+# time, so no request pays for the first compile either.
+
+templates_cli = AppGroup('templates', help='Precompile Jinja templates.')
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    # Workers share the directory: an entry is written to a temporary file
+    # and renamed into place, so no worker reads one half written
+
+    def dump_bytecode(self, bucket):
+        with tempfile.NamedTemporaryFile('wb', dir=self.directory, delete=False) as f:
+            bucket.write_bytecode(f)
+        os.replace(f.name, self._get_cache_filename(bucket))
+
+
+def init_app(app):
+    app.cli.add_command(templates_cli)
+    directory = app.config['TEMPLATE_CACHE_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = TemplateBytecodeCache(directory)
+
+
+@templates_cli.command('compile', help='Compile every template into TEMPLATE_CACHE_DIR.')
+@with_appcontext
+def compile_templates():
+    environment = current_app.jinja_env
+    if environment.bytecode_cache is None:
+        raise click.ClickException('TEMPLATE_CACHE_DIR is not set')
+    # Entries of templates that were edited or removed since the last deploy
+    environment.bytecode_cache.clear()
+    environment.cache.clear()
+    started = time.perf_counter()
+    names = environment.list_templates()
+    failed = 0
+    for name in names:
+        try:
+            environment.get_template(name)
+        except TemplateSyntaxError as error:
+            failed += 1
+            click.echo('{}:{}: {}'.format(name, error.lineno, error.message), err=True)
+    click.echo('{} templates compiled into {} in {:.2f} s'.format(
+        len(names) - failed, environment.bytecode_cache.directory, time.perf_counter() - started))
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from genre_registry import genre_registry
+from matchmaking import match_index
+from models import db, Artist, Genre, Show, Venue
+from ngram_index import artist_index, venue_index
+
+
+# Every test gets the app on a fresh SQLite file. The in-process caches
+# (rendered pages, genres, matches, n-grams) outlive a database, so they
+# are emptied too, and the app config is put back afterwards.
+
+@pytest.fixture
+def app(tmp_path):
+    flask_app = app_module.app
+    saved = dict(flask_app.config)
+    flask_app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'fyyur.db'), WTF_CSRF_ENABLED=False,
+                            QUERY_AUDIT='', METRICS_DIR='', TEMPLATE_CACHE_DIR='', SESSION_STORE_URI='')
+    app_module.page_cache.clear()
+    genre_registry.invalidate()
+    match_index.build([], [])
+    venue_index.build([])
+    artist_index.build([])
+    try:
+        with flask_app.app_context():
+            db.create_all()
+            yield flask_app
+            db.session.remove()
+            db.drop_all()
+            db.get_engine().dispose()
+    finally:
+        flask_app.config.clear()
+        flask_app.config.update(saved)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    # (template name, context) of every render_template call in app.py
+    calls = []
+    render_template = app_module.render_template
+
+    def record(name, **context):
+        calls.append((name, context))
+        return render_template(name, **context)
+
+    monkeypatch.setattr(app_module, 'render_template', record)
+    return calls
+
+
+@pytest.fixture
+def catalog(app):
+    """Two venues and two artists with a past and an upcoming show each."""
+    now = datetime.now()
+    for name in ('Jazz', 'Rock n Roll', 'Folk'):
+        db.session.add(Genre(name=name))
+    venues = [Venue(name='The Musical Hop', city='San Francisco', state='CA'),
+              Venue(name='Park Square Live Music & Coffee', city='New York', state='NY')]
+    artists = [Artist(name='Guns N Petals', city='San Francisco', state='CA'),
+               Artist(name='Matt Quevedo', city='New York', state='NY')]
+    db.session.add_all(venues + artists)
+    for number, (venue, artist) in enumerate(zip(venues, artists)):
+        db.session.add(Show(venue=venue, artist=artist, start_time=now - timedelta(days=number + 1)))
+        db.session.add(Show(venue=venue, artist=artist, start_time=now + timedelta(days=number + 1)))
+    db.session.commit()
+    return venues, artists
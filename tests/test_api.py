@@ -0,0 +1,53 @@
+from models import db, Artist, Venue
+
+
+def _add_venues(count):
+    db.session.add_all(Venue(name='Venue {:03d}'.format(number), city='Austin', state='TX') for number in range(count))
+    db.session.commit()
+
+
+def _walk(client, url):
+    # Every item of every page from url on, following "next"
+    items = []
+    while url:
+        body = client.get(url).get_json()
+        items.extend(body['data'])
+        url = body['next']
+    return items
+
+
+def test_collections_are_paged(client):
+    _add_venues(7)
+    first = client.get('/api/v1/venues?per_page=3')
+    body = first.get_json()
+    assert [venue['name'] for venue in body['data']] == ['Venue 000', 'Venue 001', 'Venue 002']
+    assert body['prev'] is None
+    assert len(_walk(client, '/api/v1/venues?per_page=3')) == 7
+
+    assert client.get('/api/v1/venues?per_page=3', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    db.session.add(Venue(name='Venue 100', city='Austin', state='TX'))
+    db.session.commit()
+    assert client.get('/api/v1/venues?per_page=3', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_search_without_a_term_is_paged(app, client):
+    _add_venues(app.config['MAX_PAGE_SIZE'] + 5)
+    body = client.get('/api/v1/search/venues?per_page=100000').get_json()
+    assert len(body['data']) == app.config['MAX_PAGE_SIZE']
+    assert body['next'] is not None
+
+    names = [venue['name'] for venue in _walk(client, '/api/v1/search/venues?q=venue&per_page=50')]
+    assert len(names) == len(set(names)) == app.config['MAX_PAGE_SIZE'] + 5
+
+
+def test_search_ranks_exact_matches_first(client):
+    db.session.add_all([Artist(name='The Wild Sax Band'), Artist(name='Sax'), Artist(name='Saxophone Trio')])
+    db.session.commit()
+    body = client.get('/api/v1/search/artists?q=sax&per_page=2').get_json()
+    assert [artist['name'] for artist in body['data']] == ['Sax', 'Saxophone Trio']
+    assert [artist['name'] for artist in client.get(body['next']).get_json()['data']] == ['The Wild Sax Band']
+
+
+def test_malformed_cursor_is_a_bad_request(client):
+    assert client.get('/api/v1/search/venues?after=garbage').status_code == 400
+    assert client.get('/api/v1/venues?after=garbage').get_json() == {'error': 'bad request'}
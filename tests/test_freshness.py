@@ -0,0 +1,61 @@
+import freshness
+from models import db, Artist, Venue, table_versions
+
+
+def _version(name):
+    # Read on a connection of its own, outside the session's transaction
+    with db.engine.connect() as connection:
+        return connection.execute(
+            table_versions.select().where(table_versions.c.name == name)).first()
+
+
+def test_listing_answers_304_until_its_tables_change(client, catalog):
+    first = client.get('/venues')
+    etag = first.headers['ETag']
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 304
+
+    db.session.add(Venue(name='The Dueling Pianos Bar', city='New York', state='NY'))
+    db.session.commit()
+    changed = client.get('/venues', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+    etag = changed.headers['ETag']
+    db.session.delete(db.session.query(Venue).filter_by(name='The Dueling Pianos Bar').one())
+    db.session.commit()
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_other_tables_keep_a_listing_fresh(client, catalog):
+    etag = client.get('/venues').headers['ETag']
+    db.session.query(Artist).update({'seeking_venue': True}, synchronize_session=False)
+    db.session.commit()
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/artists', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_versions_are_bumped_after_commit(app, catalog):
+    before = _version('Venue').version
+    db.session.add(Venue(name='Unsaved', city='Austin', state='TX'))
+    db.session.flush()
+    # Nothing holds the version row while the writing transaction is open
+    assert _version('Venue').version == before
+    db.session.rollback()
+    assert _version('Venue').version == before
+
+    db.session.add(Venue(name='Saved', city='Austin', state='TX'))
+    db.session.commit()
+    assert _version('Venue').version == before + 1
+
+
+def test_release_comes_from_the_setting(app, monkeypatch):
+    monkeypatch.setattr(freshness, 'RELEASE', freshness.RELEASE)
+    monkeypatch.setitem(app.config, 'RELEASE', 'v1')
+    freshness.init_app(app)
+    release = freshness.RELEASE
+    monkeypatch.setattr(freshness, '_newest_source', lambda root: 1 / 0)
+    freshness.init_app(app)
+    assert freshness.RELEASE == release
+    monkeypatch.setitem(app.config, 'RELEASE', 'v2')
+    freshness.init_app(app)
+    assert freshness.RELEASE != release
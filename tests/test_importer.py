@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Artist, Show, Venue, artist_show_counts
+from query_audit import assert_max_queries
+
+
+@pytest.fixture
+def owners(app):
+    venues = [Venue(name='Venue {}'.format(number), city='Austin', state='TX') for number in range(3)]
+    artists = [Artist(name='Artist {}'.format(number), city='Austin', state='TX') for number in range(3)]
+    db.session.add_all(venues + artists)
+    db.session.commit()
+    return [venue.id for venue in venues], [artist.id for artist in artists]
+
+
+def _import_shows(app, tmp_path, rows):
+    path = tmp_path / 'shows.csv'
+    path.write_text('venue_id,artist_id,start_time\n' + ''.join('{},{},{}\n'.format(*row) for row in rows))
+    result = app.test_cli_runner(mix_stderr=False).invoke(args=['import', 'shows', str(path)])
+    db.session.remove()
+    return result
+
+
+def test_reimporting_shows_skips_them(app, tmp_path, owners):
+    venue_ids, artist_ids = owners
+    rows = [(venue_ids[0], artist_ids[0], '2030-01-01 20:00:00'),
+            (venue_ids[0], artist_ids[0], '2030-01-01 20:00:00'),
+            (venue_ids[1], artist_ids[1], '2030-01-02 20:00:00')]
+    first = _import_shows(app, tmp_path, rows)
+    assert first.exit_code == 0, first.stderr
+    assert '2 written, 0 rejected' in first.stdout
+    again = _import_shows(app, tmp_path, rows)
+    assert again.exit_code == 0, again.stderr
+    assert '0 written, 0 rejected' in again.stdout
+    assert db.session.query(Show).count() == 2
+
+
+def test_overlapping_shows_are_rejected(app, tmp_path, owners):
+    venue_ids, artist_ids = owners
+    db.session.add(Show(venue_id=venue_ids[0], artist_id=artist_ids[0], start_time=datetime(2030, 1, 1, 20)))
+    db.session.commit()
+    result = _import_shows(app, tmp_path, [
+        (venue_ids[0], artist_ids[1], '2030-01-01 22:00:00'),  # the venue is booked until 23:00
+        (venue_ids[1], artist_ids[0], '2030-01-01 19:00:00'),  # the artist starts at 20:00
+        (venue_ids[2], artist_ids[2], '2030-01-03 20:00:00'),
+        (venue_ids[2], artist_ids[1], '2030-01-03 21:00:00'),  # overlaps the row before
+        (venue_ids[0], artist_ids[1], '2030-01-01 23:00:00'),  # starts as the booking ends
+    ])
+    assert result.exit_code == 1
+    assert '2 written, 3 rejected' in result.stdout
+    for line in (1, 2, 4):
+        assert 'row {} rejected'.format(line) in result.stderr
+    assert 'the venue is already booked from 2030-01-01 20:00 to 2030-01-01 23:00' in result.stderr
+    assert db.session.query(Show).count() == 3
+
+
+def test_show_counts_are_refreshed(app, tmp_path, owners):
+    venue_ids, artist_ids = owners
+    _import_shows(app, tmp_path, [(venue_ids[0], artist_ids[0], '2030-01-01 20:00:00'),
+                                  (venue_ids[1], artist_ids[0], '2030-01-02 20:00:00')])
+    counts = db.session.query(artist_show_counts.c.total, artist_show_counts.c.upcoming).filter(
+        artist_show_counts.c.artist_id == artist_ids[0]).one()
+    assert tuple(counts) == (2, 2)
+
+
+# Lookups, the overlap check (temporary table, insert, query, drop), the
+# insert, the version bump and the rollup refresh, for 3 rows as for 300
+BATCH_QUERIES = 14
+
+
+@pytest.mark.parametrize('shows', [3, 300])
+def test_a_batch_runs_the_same_queries_however_many_rows(app, tmp_path, shows):
+    venue = Venue(name='Hall', city='Austin', state='TX')
+    artists = [Artist(name='Artist {}'.format(number)) for number in range(shows)]
+    db.session.add_all([venue] + artists)
+    db.session.commit()
+    rows = [(venue.id, artist.id, datetime(2030, 1, 1) + timedelta(hours=4 * number)) for number, artist in enumerate(artists)]
+    with assert_max_queries(BATCH_QUERIES):
+        result = _import_shows(app, tmp_path, rows)
+    assert result.exit_code == 0, result.stderr
+    assert db.session.query(Show).count() == shows
@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Artist, Venue
+from pagination import keyset_paginate
+
+
+def _walk(query, keys, per_page):
+    # Every page forwards, then every page back again from the last one
+    pages = [keyset_paginate(query, keys, per_page=per_page)]
+    while pages[-1].has_next:
+        pages.append(keyset_paginate(query, keys, after=pages[-1].next_cursor, per_page=per_page))
+    backwards = [pages[-1]]
+    while backwards[-1].has_prev:
+        backwards.append(keyset_paginate(query, keys, before=backwards[-1].prev_cursor, per_page=per_page))
+    return [page.items for page in pages], [page.items for page in reversed(backwards)]
+
+
+def test_pages_cover_every_row_once_in_both_directions(app):
+    # Repeated names and the empty name still page in (name, id) order
+    db.session.add_all(Artist(name=name) for name in ['B', 'A', '', 'B', 'C', 'B', '', 'A'])
+    db.session.commit()
+    keys = (Artist.name, Artist.id)
+    forwards, backwards = _walk(Artist.query, keys, per_page=3)
+    rows = [(artist.name, artist.id) for page in forwards for artist in page]
+    assert rows == sorted((artist.name, artist.id) for artist in Artist.query)
+    assert [len(page) for page in forwards] == [3, 3, 2]
+    assert backwards == forwards
+
+
+def test_areas_page_across_cities_and_states(app):
+    db.session.add_all(Venue(name='Venue {}'.format(number), city='City {}'.format(number % 3), state=('', 'NY', 'CA')[number % 2])
+                       for number in range(7))
+    db.session.commit()
+    forwards, backwards = _walk(Venue.area_query(), (Venue.state, Venue.city, Venue.id), per_page=2)
+    assert sum(len(page) for page in forwards) == 7
+    assert backwards == forwards
+
+
+@pytest.mark.parametrize('model, fields', [
+    (Artist, {'name': None}),
+    (Venue, {'name': 'Hall', 'city': None, 'state': 'TX'}),
+    (Venue, {'name': 'Hall', 'city': 'Austin', 'state': None}),
+])
+def test_pagination_keys_are_not_null(app, model, fields):
+    db.session.add(model(**fields))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+@pytest.mark.parametrize('url', ['/artists?after=', '/artists?before=', '/venues?after=&before=',
+                                 '/shows?after=', '/api/v1/artists?after=', '/api/v1/search/artists?after='])
+def test_an_empty_cursor_is_the_first_page(client, catalog, url):
+    assert client.get(url).status_code == 200
+
+
+def test_a_malformed_cursor_is_a_bad_request(client):
+    assert client.get('/artists?after=garbage').status_code == 400
@@ -0,0 +1,125 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+
+import query_audit
+from models import db
+from query_audit import NPlusOneError, QueryBudgetExceeded, query_budget
+
+
+# Every view with a @query_budget, as (method, url, form data); the catalog
+# is enough for each one to walk its shows, genres and areas
+BUDGETED = [
+    ('GET', '/venues', None),
+    ('POST', '/venues/search', {'search_term': 'music'}),
+    ('GET', '/venues/near?lat=37.77&lon=-122.42&radius=50', None),
+    ('GET', '/venues/{venue}', None),
+    ('GET', '/artists', None),
+    ('POST', '/artists/search', {'search_term': 'a'}),
+    ('GET', '/artists/{artist}', None),
+    ('GET', '/shows', None),
+]
+
+
+@pytest.fixture
+def audited(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'QUERY_AUDIT', 'raise')
+    monkeypatch.setitem(app.config, 'TESTING', True)
+    return app
+
+
+def test_every_budgeted_view_is_covered(app):
+    budgeted = {rule.rule for rule in app.url_map.iter_rules()
+                if hasattr(app.view_functions[rule.endpoint], 'query_budget')}
+    covered = {url.split('?')[0].replace('{venue}', '<int:venue_id>').replace('{artist}', '<int:artist_id>')
+               for method, url, data in BUDGETED}
+    assert budgeted == covered
+
+
+@pytest.mark.parametrize('method, url, data', BUDGETED)
+def test_views_stay_within_their_budgets(audited, client, catalog, method, url, data):
+    venues, artists = catalog
+    for venue in venues:
+        venue.latitude, venue.longitude = 37.78, -122.41
+    db.session.commit()
+    url = url.format(venue=venues[0].id, artist=artists[0].id)
+    # Raises NPlusOneError or QueryBudgetExceeded out of the test client
+    response = client.open(url, method=method, data=data)
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def probe():
+    # A bare app with the audit on, whose views query an engine of their own
+    probe_app = Flask(__name__)
+    probe_app.config.update(QUERY_AUDIT='raise', N_PLUS_ONE_THRESHOLD=5, TESTING=True)
+    query_audit.init_app(probe_app)
+    engine = create_engine('sqlite://')
+    yield probe_app, engine
+    engine.dispose()
+
+
+def test_a_repeated_statement_is_reported(probe):
+    probe_app, engine = probe
+
+    @probe_app.route('/loop')
+    def loop():
+        for number in range(5):
+            engine.execute('SELECT ?', number).scalar()
+        return ''
+
+    with pytest.raises(NPlusOneError) as raised:
+        probe_app.test_client().get('/loop')
+    assert 'GET /loop' in str(raised.value)
+    assert 'in loop' in str(raised.value)
+
+
+def test_a_repeated_statement_is_logged(probe, caplog):
+    probe_app, engine = probe
+    probe_app.config['QUERY_AUDIT'] = 'log'
+
+    @probe_app.route('/loop')
+    def loop():
+        for number in range(5):
+            engine.execute('SELECT ?', number).scalar()
+        return ''
+
+    assert probe_app.test_client().get('/loop').status_code == 200
+    assert 'possible N+1 in GET /loop' in caplog.text
+
+
+def test_going_over_budget_is_reported(probe):
+    probe_app, engine = probe
+
+    @probe_app.route('/within')
+    @query_budget(2)
+    def within():
+        engine.execute('SELECT 1').scalar()
+        engine.execute('SELECT 2').scalar()
+        return ''
+
+    @probe_app.route('/over')
+    @query_budget(2)
+    def over():
+        for number in range(3):
+            engine.execute('SELECT {}'.format(number)).scalar()
+        return ''
+
+    client = probe_app.test_client()
+    assert client.get('/within').status_code == 200
+    with pytest.raises(QueryBudgetExceeded, match='over ran 3 queries, its budget is 2'):
+        client.get('/over')
+
+
+def test_budgets_are_off_without_the_setting(probe):
+    probe_app, engine = probe
+    probe_app.config['QUERY_AUDIT'] = ''
+
+    @probe_app.route('/over')
+    @query_budget(0)
+    def over():
+        for number in range(5):
+            engine.execute('SELECT 1').scalar()
+        return ''
+
+    assert probe_app.test_client().get('/over').status_code == 200
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+import search as search_module
+from models import db, Artist, Genre, Venue
+from ngram_index import venue_index
+
+
+def _names(model, term):
+    return [row.name for row in search_module.search(model, term)]
+
+
+def test_names_rank_exact_then_prefix_then_substring(app):
+    db.session.add_all([Artist(name='The Wild Sax Band'), Artist(name='Saxophone Trio'), Artist(name='Sax')])
+    db.session.commit()
+    assert _names(Artist, ' sax ') == ['Sax', 'Saxophone Trio', 'The Wild Sax Band']
+
+
+def test_city_state_and_genres_match(app, catalog):
+    venues, artists = catalog
+    artists[1].genres.append(db.session.query(Genre).filter_by(name='Folk').one())
+    db.session.commit()
+    assert _names(Venue, 'san fran') == ['The Musical Hop']
+    assert _names(Venue, 'NY') == ['Park Square Live Music & Coffee']
+    assert _names(Artist, 'folk') == ['Matt Quevedo']
+
+
+def test_like_wildcards_are_literal(app):
+    db.session.add_all([Venue(name='100% Jazz', city='Austin', state='TX'), Venue(name='Dive_Bar', city='Austin', state='TX'),
+                        Venue(name='Divebar', city='Austin', state='TX')])
+    db.session.commit()
+    assert _names(Venue, '0%') == ['100% Jazz']
+    assert _names(Venue, 'e_b') == ['Dive_Bar']
+
+
+def test_search_pages_show_counts(client, catalog, rendered):
+    response = client.post('/venues/search', data={'search_term': 'hop'})
+    assert response.status_code == 200
+    name, context = rendered[-1]
+    assert name == 'pages/search_venues.html'
+    assert context['results']['count'] == 1
+    assert context['results']['data'][0]['num_upcoming_shows'] == 1
+
+
+@pytest.fixture
+def ngram(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SEARCH_BACKEND', 'ngram')
+    return app
+
+
+def test_ngram_index_follows_creates_and_deletes(ngram, client, catalog):
+    assert _names(Venue, 'hop') == []  # built empty by the app fixture
+    client.post('/venues/create', data={'name': 'Hop Scotch', 'city': 'Austin', 'state': 'TX', 'genres': 'Jazz'})
+    assert _names(Venue, 'hop') == ['Hop Scotch']
+    venue = db.session.query(Venue).filter_by(name='Hop Scotch').one()
+    client.delete('/venues/{}'.format(venue.id))
+    assert _names(Venue, 'hop') == []
+
+
+def test_ngram_index_is_built_on_first_search(ngram, catalog, monkeypatch):
+    monkeypatch.setattr(venue_index, 'built_at', None)
+    assert _names(Venue, 'square') == ['Park Square Live Music & Coffee']
+    assert venue_index.built_at is not None
+
+
+def test_stale_ngram_index_is_served_while_rebuilt(ngram, catalog, monkeypatch):
+    monkeypatch.setitem(ngram.config, 'SEARCH_INDEX_MAX_AGE', 0)
+    release = threading.Event()
+    rebuild = search_module._rebuild
+
+    def held_rebuild(app, model):
+        release.wait(5)
+        rebuild(app, model)
+
+    monkeypatch.setattr(search_module, '_rebuild', held_rebuild)
+    # Searches see the old (empty) index and start a single rebuild
+    assert _names(Venue, 'hop') == []
+    assert _names(Venue, 'hop') == []
+    rebuilds = [thread for thread in threading.enumerate() if thread.name == 'search-index']
+    assert len(rebuilds) == 1
+    release.set()
+    rebuilds[0].join(5)
+    assert not search_module._rebuilding[Venue].locked()
+    monkeypatch.setitem(ngram.config, 'SEARCH_INDEX_MAX_AGE', 300)
+    assert _names(Venue, 'hop') == ['The Musical Hop']
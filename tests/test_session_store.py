@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import inspect
+
+from models import db, sessions_table
+from session_store import ServerSideSessionInterface
+
+
+@pytest.fixture
+def store(app, monkeypatch):
+    # The store shares the test database, whose tables come from the models
+    interface = ServerSideSessionInterface(app.config['SQLALCHEMY_DATABASE_URI'], 60)
+    monkeypatch.setattr(app, 'session_interface', interface)
+    yield interface
+    interface.engine.dispose()
+
+
+def test_flashes_are_kept_server_side(client, store, catalog):
+    venues, artists = catalog
+    client.delete('/venues/{}'.format(venues[0].id))
+    with db.engine.connect() as connection:
+        assert connection.execute(sessions_table.count()).scalar() == 1
+    assert b'was successfully deleted' in client.get('/').data
+    assert b'was successfully deleted' not in client.get('/').data
+
+
+def test_the_store_does_not_create_its_table(tmp_path):
+    interface = ServerSideSessionInterface('sqlite:///' + str(tmp_path / 'sessions.db'), 60)
+    assert 'flask_sessions' not in inspect(interface.engine).get_table_names()
+    interface.engine.dispose()
+
+
+def test_create_table_command(app, tmp_path, monkeypatch):
+    interface = ServerSideSessionInterface('sqlite:///' + str(tmp_path / 'sessions.db'), 60)
+    monkeypatch.setattr(app, 'session_interface', interface)
+    result = app.test_cli_runner().invoke(args=['sessions', 'create-table'])
+    assert result.exit_code == 0, result.output
+    assert 'flask_sessions' in inspect(interface.engine).get_table_names()
+    assert interface.purge() == 0
+    interface.engine.dispose()
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+from models import db, Artist, Show, Venue
+
+
+@pytest.fixture
+def owners(app):
+    venues = [Venue(name='Venue {}'.format(number), city='Austin', state='TX') for number in range(2)]
+    artists = [Artist(name='Artist {}'.format(number), city='Austin', state='TX') for number in range(2)]
+    db.session.add_all(venues + artists)
+    db.session.add(Show(venue=venues[0], artist=artists[0], start_time=datetime(2030, 1, 1, 20), end_time=datetime(2030, 1, 1, 23)))
+    db.session.commit()
+    return [venue.id for venue in venues], [artist.id for artist in artists]
+
+
+def _list_show(client, venue_id, artist_id, start_time, end_time=''):
+    return client.post('/shows/create', data={'venue_id': venue_id, 'artist_id': artist_id,
+                                               'start_time': start_time, 'end_time': end_time})
+
+
+def test_a_show_is_listed(client, owners):
+    venue_ids, artist_ids = owners
+    response = _list_show(client, venue_ids[1], artist_ids[1], '2030-01-01 20:00')
+    assert b'Show was successfully listed!' in response.data
+    show = db.session.query(Show).filter_by(venue_id=venue_ids[1]).one()
+    assert (show.start_time, show.end_time) == (datetime(2030, 1, 1, 20), datetime(2030, 1, 1, 23))
+
+
+@pytest.mark.parametrize('start_time, end_time, error', [
+    ('', '', b'This field is required.'),
+    ('2030-01-02 20:00', '2030-01-02 19:00', b'End time must be after the start time.'),
+    ('2030-01-02 20:00', '2030-01-02 20:00', b'End time must be after the start time.'),
+])
+def test_an_invalid_form_is_shown_again_with_its_errors(client, owners, start_time, end_time, error):
+    venue_ids, artist_ids = owners
+    response = _list_show(client, venue_ids[1], artist_ids[1], start_time, end_time)
+    assert response.status_code == 400
+    assert b'List a new show' in response.data
+    assert error in response.data
+    assert db.session.query(Show).count() == 1
+
+
+@pytest.mark.parametrize('venue, artist, start_time, end_time, message', [
+    (0, 1, '2030-01-01 22:00', '', b'the venue is already booked from 2030-01-01 20:00 to 2030-01-01 23:00'),
+    (1, 0, '2030-01-01 18:00', '2030-01-01 20:30', b'the artist is already booked from 2030-01-01 20:00 to 2030-01-01 23:00'),
+    (1, 0, '2030-01-01 19:00', '2030-01-02 01:00', b'the artist is already booked'),
+])
+def test_overlapping_bookings_are_rejected(client, owners, venue, artist, start_time, end_time, message):
+    venue_ids, artist_ids = owners
+    response = _list_show(client, venue_ids[venue], artist_ids[artist], start_time, end_time)
+    assert b'Show could not be listed: ' + message in response.data
+    assert db.session.query(Show).count() == 1
+
+
+def test_back_to_back_bookings_are_accepted(client, owners):
+    venue_ids, artist_ids = owners
+    _list_show(client, venue_ids[0], artist_ids[1], '2030-01-01 23:00')
+    _list_show(client, venue_ids[1], artist_ids[0], '2030-01-01 17:00', '2030-01-01 20:00')
+    assert db.session.query(Show).count() == 3
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Artist, Show, Venue
+from query_audit import assert_max_queries
+
+
+# /venues answers from one grouped query however many venues and areas
+# there are, after the two freshness queries of conditional()
+VENUES_PAGE_QUERIES = 3
+
+
+def _add_venues(count):
+    now = datetime.now()
+    for number in range(count):
+        artist = Artist(name='Artist {}'.format(number), city='San Francisco', state='CA')
+        venue = Venue(name='Venue {}'.format(number), city='City {}'.format(number % 7), state=('CA', 'NY', 'TX')[number % 3])
+        db.session.add_all([venue, artist])
+        # venue n has n + 1 upcoming shows and one past show
+        for day in range(number + 1):
+            db.session.add(Show(venue=venue, artist=artist, start_time=now + timedelta(days=number + 1, hours=4 * day)))
+        db.session.add(Show(venue=venue, artist=artist, start_time=now - timedelta(days=number + 1)))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('venues', [3, 60])
+def test_venues_query_count_does_not_grow_with_venues(client, venues):
+    _add_venues(venues)
+    with assert_max_queries(VENUES_PAGE_QUERIES):
+        response = client.get('/venues?per_page=200')
+    assert response.status_code == 200
+    assert response.data.count(b'/venues/') >= venues
+
+
+def test_venues_lists_upcoming_show_counts(client, rendered):
+    _add_venues(4)
+    with assert_max_queries(VENUES_PAGE_QUERIES):
+        response = client.get('/venues')
+    assert response.status_code == 200
+    name, context = rendered[-1]
+    assert name == 'pages/venues.html'
+    counts = {venue['name']: venue['num_upcoming_shows'] for area in context['areas'] for venue in area['venues']}
+    assert counts == {'Venue 0': 1, 'Venue 1': 2, 'Venue 2': 3, 'Venue 3': 4}
+    assert [(area['state'], area['city']) for area in context['areas']] == sorted(
+        (area['state'], area['city']) for area in context['areas'])
+
+
+def test_deleting_a_venue_deletes_its_shows(client, catalog):
+    venues, artists = catalog
+    venue_id, artist_id = venues[0].id, artists[0].id
+    assert client.get('/artists/{}'.format(artist_id)).status_code == 200
+
+    client.delete('/venues/{}'.format(venue_id))
+
+    assert db.session.query(Venue).get(venue_id) is None
+    assert db.session.query(Show).filter(Show.venue_id == None).count() == 0
+    assert db.session.query(Show).filter(Show.artist_id == artist_id).count() == 0
+    response = client.get('/artists/{}'.format(artist_id))
+    assert response.status_code == 200
+    venue_link = '/venues/{}"'.format(venue_id).encode()
+    assert venue_link not in response.data
+    assert venue_link not in client.get('/shows').data